@@ -1,19 +1,35 @@
-from flask import Flask, render_template, request
-from flask_sqlalchemy import SQLAlchemy
+from flask import Response, g, has_request_context, jsonify, render_template, request, stream_with_context
 from datetime import datetime
-from services.api_service import TravelAPI
-import re
-import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-import joblib
+from models import app, db, Destination, DestinationCluster, current_data_version, data_version_state
+from clustering import model_registry, needs_clusters, train_kmeans_model, preference_matrix, preference_key
+from services.retrain import RetrainScheduler
+from services.feature_encoder import SchemaMismatchError
+from services.ranking_cache import RankingCache
+from services.page_cache import PageCache, make_store
+from services.metrics import Metrics, server_timing
+from services.profiling import SamplingProfiler
+from services.schema import upgrade_schema
+from services import batch_scoring, search_index
+import functools
+import json
 import os
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///travel.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-api = TravelAPI()
+import time
+import numpy as np
+
+# Send per-request span timings back in a Server-Timing header
+app.config['SERVER_TIMING'] = os.getenv('SERVER_TIMING') == '1'
+ranking_cache = RankingCache(maxsize=int(os.getenv('RANKING_CACHE_SIZE', 64)))
+# Column arrays of the whole catalog for batch scoring; one per version
+catalog_cache = RankingCache(maxsize=1)
+page_cache = PageCache(
+    make_store(os.getenv('PAGE_CACHE_URL'), maxsize=int(os.getenv('PAGE_CACHE_SIZE', 256))),
+    ttl=int(os.getenv('PAGE_CACHE_TTL', 3600)),
+)
+metrics = Metrics(prefix='travel_')
+profiler = SamplingProfiler(
+    os.getenv('PROFILE_CONTROL_FILE', 'instance/profile_rate'),
+    os.getenv('PROFILE_DIR', 'instance/profiles'),
+)
 
 user_prefs = {
     'budget': 'Medium',
@@ -21,18 +37,11 @@ user_prefs = {
     'rating': 4.0,
 }
 per_page = 5
-
-# Database Models
-class Destination(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    city = db.Column(db.String(100), nullable=False)
-    climate = db.Column(db.String(50))
-    budget_category = db.Column(db.String(20))
-    info = db.Column(db.String(255))
-    rating = db.Column(db.Float)
-    price = db.Column(db.String(50))
-    image_url = db.Column(db.String(500))
+# Limits of one /api/recommendations/batch page
+batch_max_per_page = 1000
+batch_max_k = 100
+# Profiles scored and looked up together before their results are streamed
+batch_chunk_size = 250
 
 def calculate_score(destination, user_prefs):
     climate_score = 1.0 if destination.climate == user_prefs['climate'] else 0.5
@@ -46,91 +55,374 @@ def calculate_score(destination, user_prefs):
     score = (0.4 * climate_score + 0.3 * budget_score + 0.3 * rating_score) * 100
     return round(score, 2)
 
-def train_kmeans_model():
-    destinations = Destination.query.all()
-
-    if not destinations:
-        return None, None, None
+def score_expression(user_prefs):
+    # Same weights as calculate_score, evaluated by the database for every row
+    climate_score = db.case((Destination.climate == user_prefs['climate'], 1.0), else_=0.5)
+    budget_score = db.case((Destination.budget_category == user_prefs['budget'], 1.0), else_=0.3)
+    if user_prefs.get('rating') is not None:
+        rating = float(user_prefs['rating'])
+        rating_score = db.case(
+            (Destination.rating.is_(None), 0.5),
+            (Destination.rating >= rating, rating / 5.0),
+            else_=0.0,
+        )
+    else:
+        rating_score = db.literal(0.5)
+    score = (0.4 * climate_score + 0.3 * budget_score + 0.3 * rating_score) * 100
+    return db.func.round(score, 2).label('score')
 
-    data = []
-    for d in destinations:
-        try:
-            budget = {'Low': 0, 'Medium': 1, 'High': 2}.get(d.budget_category, 1)
-            climate = {'Tropical': 0, 'Savannah': 1, 'Arid': 2, 'Temperate': 3}.get(d.climate, 1)
-            rating = d.rating if d.rating is not None else 0
-            data.append({'id': d.id, 'budget': budget, 'climate': climate, 'rating': rating})
-        except:
-            continue
+def cluster_labels(model_version):
+    # Join target and condition for the labels of the model being served
+    return DestinationCluster, (
+        (DestinationCluster.destination_id == Destination.id)
+        & (DestinationCluster.model_version == model_version)
+    )
 
-    df = pd.DataFrame(data)
-    scaler = StandardScaler()
-    X = scaler.fit_transform(df[['budget', 'climate', 'rating']])
-    model = KMeans(n_clusters=5, random_state=42)
-    model.fit(X)
-    df['cluster'] = model.labels_
+def cluster_first(cluster):
+    # Needs cluster_labels joined (outer, so unlabelled rows are kept)
+    if cluster is None:
+        return db.literal(0)
+    return db.case((DestinationCluster.cluster == cluster, 0), else_=1)
+
+def fetch_page(score, filters, ordering, page, joins=(), outerjoins=()):
+    # COUNT only touches the filter columns; the page itself is sorted and
+    # sliced in SQL so only per_page rows are loaded. Outer joins are only
+    # needed for the ordering and never change the count.
+    count_query = db.session.query(db.func.count(Destination.id)).select_from(Destination)
+    query = db.session.query(Destination, score)
+    for target, onclause in joins:
+        count_query = count_query.join(target, onclause)
+        query = query.join(target, onclause)
+    for target, onclause in outerjoins:
+        query = query.outerjoin(target, onclause)
+    with metrics.span('db'):
+        total = count_query.filter(*filters).scalar()
+        rows = (
+            query
+            .filter(*filters)
+            .order_by(*ordering)
+            .limit(per_page)
+            .offset((max(page, 1) - 1) * per_page)
+            .all()
+        )
+    destinations = []
+    for dest, dest_score in rows:
+        dest.score = dest_score
+        destinations.append(dest)
+    return destinations, (total + per_page - 1) // per_page
+
+def serving_version(snapshot):
+    # The published artifact version names the labels the rankings read
+    return (current_data_version(), snapshot.artifact_version if snapshot is not None else None)
+
+def current_version():
+    return serving_version(current_snapshot())
+
+def ranked_ids(key, query, version=None):
+    # The ordering depends only on the key, so the full ranked id list is
+    # built once per data/model version and every page is a slice of it
+    version = version or current_version()
+
+    def build():
+        with metrics.span('db'):
+            return np.fromiter((row_id for (row_id,) in query), dtype=np.int64)
+    return ranking_cache.get(version, key, build)
+
+def home_ranking(cluster, user_prefs, version=None):
+    # Cluster ones first, then by score
+    version = version or current_version()
+    score = score_expression(user_prefs)
+    query = db.session.query(Destination.id)
+    if cluster is not None:
+        query = query.outerjoin(*cluster_labels(version[1]))
+    return ranked_ids(
+        ('home', cluster) + preference_key(user_prefs),
+        query.order_by(cluster_first(cluster), score.desc(), Destination.id),
+        version,
+    )
 
-    joblib.dump(model, 'kmeans_model.pkl')
-    joblib.dump(scaler, 'scaler.pkl')
-    df[['id', 'cluster']].to_csv('clusters.csv', index=False)
+def suggest_ranking(cluster, version=None):
+    # Now every result is relevant by cluster, so the ordering depends on the cluster alone
+    version = version or current_version()
+    query = db.session.query(Destination.id)
+    if cluster is not None:
+        query = query.join(*cluster_labels(version[1])).filter(DestinationCluster.cluster == cluster)
+    return ranked_ids(
+        ('suggest', cluster),
+        query.order_by(db.func.coalesce(Destination.rating, 0).desc(), Destination.id),
+        version,
+    )
 
-    return model, scaler, df[['id', 'cluster']]
+def ranked_page(ids, page, user_prefs):
+    start = (max(page, 1) - 1) * per_page
+    page_ids = ids[start:start + per_page].tolist()
+    with metrics.span('db'):
+        rows = {dest.id: dest for dest in Destination.query.filter(Destination.id.in_(page_ids))}
+    destinations = [rows[row_id] for row_id in page_ids if row_id in rows]
+    with metrics.span('score'):
+        for dest in destinations:
+            dest.score = calculate_score(dest, user_prefs)
+    return destinations, (len(ids) + per_page - 1) // per_page
 
-def get_user_cluster(user_prefs):
-    if not os.path.exists('kmeans_model.pkl') or not os.path.exists('scaler.pkl'):
-        train_kmeans_model()
+def retrain_model():
+    # None when there is nothing to train on, so the scheduler backs off
+    model, _, _ = train_kmeans_model()
+    return model
 
-    model = joblib.load('kmeans_model.pkl')
-    scaler = joblib.load('scaler.pkl')
+retrainer = RetrainScheduler(app, retrain_model, generation=lambda: model_registry.loaded_version)
 
-    user_vector = pd.DataFrame([{
-        'budget': {'Low': 0, 'Medium': 1, 'High': 2}.get(user_prefs['budget'], 1),
-        'climate': {'Tropical': 0, 'Savannah': 1, 'Arid': 2, 'Temperate': 3}.get(user_prefs['climate'], 1),
-        'rating': float(user_prefs['rating'])
-    }])
-    X_user = scaler.transform(user_vector)
-    return model.predict(X_user)[0]
+def current_snapshot():
+    # One snapshot per request, so the predicted cluster, the labels it is
+    # matched against and the page cache key all come from the same model
+    if has_request_context() and 'snapshot' in g:
+        return g.snapshot
+    try:
+        with metrics.span('model_load'):
+            snapshot = model_registry.get()
+    except SchemaMismatchError as e:
+        # The published model encodes features differently; never predict with it
+        app.logger.error("Model rejected: %s", e)
+        snapshot = None
+    if snapshot is None:
+        # Train in the background and serve unclustered results meanwhile
+        if app.config['BACKGROUND_RETRAIN']:
+            retrainer.request()
+    if has_request_context():
+        g.snapshot = snapshot
+    return snapshot
+
+@metrics.timed('cluster')
+def get_user_cluster(user_prefs):
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return None
+
+    key = preference_key(user_prefs)
+    with metrics.span('cluster_lookup'):
+        cluster = model_registry.predictions.get(snapshot.version, key)
+    if cluster is not None:
+        return cluster
+
+    with metrics.span('predict'):
+        X_user = snapshot.scaler.transform(preference_matrix([user_prefs]))
+        cluster = int(snapshot.model.predict(X_user)[0])
+    model_registry.predictions.put(snapshot.version, key, cluster)
+    return cluster
+
+def parse_rating(value):
+    # Ratings arrive as form fields or JSON; only a finite 0-5 number is usable
+    rating = float(value)
+    if not 0 <= rating <= 5:
+        raise ValueError(f"rating must be between 0 and 5, got {value!r}")
+    return rating
+
+def normalize_profile(profile):
+    # Missing fields fall back to the defaults, like an empty /suggest form
+    if not isinstance(profile, dict):
+        raise ValueError("every profile must be an object")
+    for field in ('budget', 'climate'):
+        if profile.get(field) is not None and not isinstance(profile[field], str):
+            raise ValueError(f"'{field}' must be a string")
+    rating = profile.get('rating')
+    return {
+        'budget': profile.get('budget') or user_prefs['budget'],
+        'climate': profile.get('climate') or user_prefs['climate'],
+        # Out of range ratings would push scores past batch_scoring.MAX_SCORE_CENTS
+        'rating': parse_rating(rating) if rating not in (None, '') else user_prefs['rating'],
+    }
 
+def predict_clusters(profiles, snapshot):
+    # Every profile in one scaler.transform + model.predict call
+    if snapshot is None or not profiles:
+        return [None] * len(profiles)
+    with metrics.span('predict'):
+        labels = snapshot.model.predict(snapshot.scaler.transform(preference_matrix(profiles)))
+    return [int(label) for label in labels]
+
+def recommendation_catalog(version=None):
+    # Column arrays of every destination, rebuilt once per data/model version
+    version = version or current_version()
+
+    def build():
+        with metrics.span('db'):
+            rows = db.session.query(
+                Destination.id, Destination.climate, Destination.budget_category,
+                Destination.rating, DestinationCluster.cluster,
+            ).outerjoin(*cluster_labels(version[1])).order_by(Destination.id).all()
+        return batch_scoring.build_catalog(rows)
+    return catalog_cache.get(version, 'catalog', build)
+
+def destination_details(ids):
+    details = {}
+    with metrics.span('db'):
+        for start in range(0, len(ids), 500):
+            for dest in Destination.query.filter(Destination.id.in_(ids[start:start + 500])):
+                details[dest.id] = {
+                    'id': dest.id,
+                    'name': dest.name,
+                    'city': dest.city,
+                    'climate': dest.climate,
+                    'budget_category': dest.budget_category,
+                    'rating': dest.rating,
+                    'price': dest.price_display or dest.price,
+                    'image_url': dest.image_url,
+                }
+    return details
+
+def iter_recommendations(profiles, k=10, ranking='home'):
+    """Yield the top k destinations for each preference profile.
+
+    With ranking='home' they come in the order the home page lists them for
+    that profile, with ranking='suggest' in the order of the /suggest results.
+    Needs an app context.
+    """
+    profiles = [normalize_profile(profile) for profile in profiles]
+    snapshot = current_snapshot()
+    # The catalog and every ranking read while the results stream belong to
+    # one data/model version
+    version = serving_version(snapshot)
+    clusters = predict_clusters(profiles, snapshot)
+    catalog = recommendation_catalog(version)
+
+    for start in range(0, len(profiles), batch_chunk_size):
+        chunk = profiles[start:start + batch_chunk_size]
+        chunk_clusters = clusters[start:start + batch_chunk_size]
+        climates = [profile['climate'] for profile in chunk]
+        budgets = [profile['budget'] for profile in chunk]
+        ratings = [profile['rating'] for profile in chunk]
+
+        with metrics.span('score'):
+            if ranking == 'home':
+                positions, cents = batch_scoring.top_k(catalog, climates, budgets, ratings, chunk_clusters, k)
+            else:
+                # /suggest ordering depends on the cluster alone and is already cached
+                positions = [
+                    batch_scoring.positions(catalog, suggest_ranking(cluster, version)[:k])
+                    for cluster in chunk_clusters
+                ]
+                cents = [
+                    batch_scoring.score_cents(catalog, climates[i:i + 1], budgets[i:i + 1], ratings[i:i + 1], columns=pos)[0]
+                    for i, pos in enumerate(positions)
+                ]
+
+        ids = [catalog.ids[pos] for pos in positions]
+        details = destination_details(sorted({int(row_id) for row_ids in ids for row_id in row_ids}))
+        for profile, cluster, row_ids, row_cents in zip(chunk, chunk_clusters, ids, cents):
+            yield {
+                'profile': profile,
+                'cluster': cluster,
+                'destinations': [
+                    {**details[int(row_id)], 'score': int(score) / 100}
+                    for row_id, score in zip(row_ids, row_cents)
+                    if int(row_id) in details
+                ],
+            }
+
+def recommend_batch(profiles, k=10, ranking='home'):
+    return list(iter_recommendations(profiles, k=k, ranking=ranking))
+
+
+def current_model_version():
+    # The published artifact version, which means the same thing in every
+    # worker sharing a page cache (unlike the per-process snapshot counter)
+    snapshot = current_snapshot()
+    return snapshot.artifact_version if snapshot is not None else None
+
+def cached_page(view):
+    # A page is a pure function of the route, its inputs and the data/model
+    # version, so the rendered HTML is cached on exactly those and served
+    # with a strong ETag; revalidating clients get a 304 without a render
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = page_cache.make_key(
+            request.endpoint,
+            sorted(request.args.items(multi=True)),
+            sorted(request.form.items(multi=True)),
+            current_data_version(),
+            current_model_version(),
+        )
+        with metrics.span('page_cache'):
+            cached = page_cache.get(key)
+        if cached is not None:
+            etag, body = cached
+        else:
+            body = view(*args, **kwargs).encode('utf-8')
+            if g.get('no_page_cache'):
+                # The view fell back to an error page; don't pin it to this version
+                etag = page_cache.make_etag(body)
+            else:
+                etag = page_cache.set(key, body)
+
+        response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
+
+def render_page(template, **context):
+    with metrics.span('render'):
+        return render_template(template, **context)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_token = metrics.start_request()
+    g.request_started = time.perf_counter()
+    g.profile = profiler.start()
+
+@app.after_request
+def finish_request_metrics(response):
+    if 'metrics_token' not in g:
+        return response
+    profiler.stop(g.profile, request.endpoint or 'unknown')
+    spans = metrics.finish_request(g.metrics_token)
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unknown'
+    metrics.observe('request_duration_seconds', elapsed, {'endpoint': endpoint})
+    metrics.inc('requests_total', {'endpoint': endpoint, 'status': response.status_code})
+    if app.config['SERVER_TIMING']:
+        spans['total'] = elapsed
+        response.headers['Server-Timing'] = server_timing(spans)
+    return response
+
+def collect_metrics():
+    caches = {
+        'prediction': model_registry.predictions.info(),
+        'ranking': ranking_cache.info(),
+        'catalog': catalog_cache.info(),
+        'page': page_cache.info(),
+    }
+    for name, info in caches.items():
+        yield 'cache_hits_total', 'counter', {'cache': name}, info['hits']
+        yield 'cache_misses_total', 'counter', {'cache': name}, info['misses']
+        if 'size' in info:
+            yield 'cache_entries', 'gauge', {'cache': name}, info['size']
+    yield 'model_loaded_version', 'gauge', None, model_registry.loaded_version or 0
+    if model_registry.loaded_artifact_version is not None:
+        yield 'model_info', 'gauge', {'artifact_version': model_registry.loaded_artifact_version}, 1
+    yield 'data_version', 'gauge', None, data_version_state['value']
+    yield 'profiler_sample_rate', 'gauge', None, profiler.rate
+    yield 'profiles_captured_total', 'counter', None, profiler.sampled
+
+metrics.add_collector(collect_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
+@cached_page
 def home():
     page = request.args.get('page', 1, type=int)  # Get current page, default to 1
 
     cluster = get_user_cluster(user_prefs)
-    cluster_df = pd.read_csv('clusters.csv')
-    cluster_ids = cluster_df[cluster_df['cluster'] == cluster]['id'].tolist()
-
-    destinations = Destination.query.all()
-
-    cluster_dests = []
-    other_dests = []
-
-    for dest in destinations:
-        dest.name = re.sub(r'^\s*\d+[\.\-\s]*', '', dest.name)
-        price = int(dest.price.replace("NGN", "").replace(",", "").strip()) if dest.price else dest.price
-        dest.price = "NGN {:,}".format(price) if price else dest.price
-        dest.score = calculate_score(dest, user_prefs)
-        # Separate cluster and non-cluster
-        if dest.id in cluster_ids:
-            cluster_dests.append(dest)
-        else:
-            other_dests.append(dest)
-
-    # Sort both lists by score
-    cluster_dests.sort(key=lambda d: d.score, reverse=True)
-    other_dests.sort(key=lambda d: d.score, reverse=True)
-
-    # Merge results: cluster ones first
-    sorted_destinations = cluster_dests + other_dests
-
-    # Paginate manually (slice the sorted list)
-    total = len(sorted_destinations)
-    paginated_destinations = sorted_destinations[(page - 1) * per_page : page * per_page]
+    ids = home_ranking(cluster, user_prefs)
+    paginated_destinations, total_pages = ranked_page(ids, page, user_prefs)
 
-    return render_template(
+    return render_page(
         'index.html',
         destinations=paginated_destinations,
         page=page,
-        total_pages=(total + per_page - 1) // per_page,  # Ceiling division
+        total_pages=total_pages,
         filtered=False,  # Indicate that this is not a filtered result
         form_data={
             'budget': None,
@@ -140,44 +432,41 @@ def home():
     )
 
 @app.route('/suggest', methods=['GET', 'POST'])
+@cached_page
 def suggest_destinations():
     page = request.args.get('page', 1, type=int)  # Get current page, default to 1
     budget = request.form.get('budget') 
     weather = request.form.get('weather') 
     rating = request.form.get('rating')
 
+    try:
+        rating_value = parse_rating(rating) if rating else user_prefs['rating']
+    except ValueError:
+        # Not one of the form's choices; rank with the default instead of failing
+        rating_value = user_prefs['rating']
+
     filter_data = {
         'budget': budget if budget else user_prefs['budget'],
         'climate': weather if weather else user_prefs['climate'],
-        'rating': rating if rating else user_prefs['rating'],
+        'rating': rating_value,
     }
 
     try:
         cluster = get_user_cluster(filter_data)
-        cluster_df = pd.read_csv('clusters.csv')
-        cluster_ids = cluster_df[cluster_df['cluster'] == cluster]['id'].tolist()
-
-        destinations = Destination.query.filter(Destination.id.in_(cluster_ids)).all()
-
-        for dest in destinations:
-            dest.name = re.sub(r'^\s*\d+[\.\-\s]*', '', dest.name)
-            price = int(dest.price.replace("NGN", "").replace(",", "").strip()) if dest.price else dest.price
-            dest.price = "NGN {:,}".format(price) if price else dest.price
-            dest.score = calculate_score(dest, filter_data)  # Now every result is relevant by cluster
-
-    except Exception as e:
-        print(f"Clustering error: {e}")
-        destinations = []
+        ids = suggest_ranking(cluster)
+        paginated_destinations, total_pages = ranked_page(ids, page, filter_data)
 
-    sorted_destinations = sorted(destinations, key=lambda d: d.rating or 0, reverse=True)
-    total = len(sorted_destinations)
-    paginated_destinations = sorted_destinations[(page - 1) * per_page : page * per_page]
+    except Exception:
+        app.logger.exception("Clustering error")
+        metrics.inc('errors_total', {'endpoint': 'suggest_destinations'})
+        g.no_page_cache = True
+        paginated_destinations, total_pages = [], 0
 
-    return render_template(
+    return render_page(
         'index.html',
         destinations=paginated_destinations,
         page=page,
-        total_pages=(total + per_page - 1) // per_page,  # Ceiling division
+        total_pages=total_pages,
         filtered=True,  # Indicate that this is a filtered result
         form_data={
             'budget': budget if budget else None,
@@ -188,58 +477,55 @@ def suggest_destinations():
 
 
 @app.route('/search', methods=['GET', 'POST'])
+@cached_page
 def search_destinations():
     page = request.args.get('page', 1, type=int)  # Get current page, default to 1
-    search_term = request.form.get('search_term')
+    search_term = request.form.get('search_term') or ''
 
     try:
         cluster = get_user_cluster(user_prefs)
-        cluster_df = pd.read_csv('clusters.csv')
-        cluster_ids = cluster_df[cluster_df['cluster'] == cluster]['id'].tolist()
-
-        
-        destinations = Destination.query.filter(
-            (Destination.name.ilike(f'%{search_term}%')) |
-            (Destination.city.ilike(f'%{search_term}%'))
-        ).all()
-
-        cluster_dests = []
-        other_dests = []
-
-        for dest in destinations:
-            dest.name = re.sub(r'^\s*\d+[\.\-\s]*', '', dest.name)
-            price = int(dest.price.replace("NGN", "").replace(",", "").strip()) if dest.price else dest.price
-            dest.price = "NGN {:,}".format(price) if price else dest.price
-            dest.score = calculate_score(dest, user_prefs)
-            # Separate cluster and non-cluster
-            if dest.id in cluster_ids:
-                cluster_dests.append(dest)
-            else:
-                other_dests.append(dest)
-
-        # Sort both lists by score
-        cluster_dests.sort(key=lambda d: d.score, reverse=True)
-        other_dests.sort(key=lambda d: d.score, reverse=True)
-
-        # Merge results: cluster ones first
-        sorted_destinations = cluster_dests + other_dests
-
-    except Exception as e:
-        print(f"Search error: {e}")
-        destinations = []
-
-    # Sort destinations by score
-    sorted_destinations = sorted(destinations, key=lambda d: d.score, reverse=True)
-
-    # Paginate manually (slice the sorted list)
-    total = len(sorted_destinations)
-    paginated_destinations = sorted_destinations[(page - 1) * per_page : page * per_page]
-
-    return render_template(
+        score = score_expression(user_prefs)
+        filters, joins = [], []
+        outerjoins = [cluster_labels(current_model_version())] if cluster is not None else []
+        ordering = [cluster_first(cluster), score.desc()]
+
+        if not search_index.match_query(search_term):
+            pass  # Nothing to match on, list everything
+        elif search_index.is_available(db.session.connection()):
+            matches = search_index.ranked_matches(search_term).columns(
+                id=db.Integer, rank=db.Float
+            ).subquery('matches')
+            joins.append((matches, matches.c.id == Destination.id))
+            # Text relevance breaks ties between equally scored destinations
+            ordering.append(matches.c.rank)
+        else:
+            filters.append(
+                (Destination.name.ilike(f'%{search_term}%')) |
+                (Destination.city.ilike(f'%{search_term}%')) |
+                (Destination.info.ilike(f'%{search_term}%'))
+            )
+
+        # Cluster ones first, then by score
+        paginated_destinations, total_pages = fetch_page(
+            score,
+            filters=filters,
+            ordering=ordering + [Destination.id],
+            page=page,
+            joins=joins,
+            outerjoins=outerjoins,
+        )
+
+    except Exception:
+        app.logger.exception("Search error")
+        metrics.inc('errors_total', {'endpoint': 'search_destinations'})
+        g.no_page_cache = True
+        paginated_destinations, total_pages = [], 0
+
+    return render_page(
         'index.html',
         destinations=paginated_destinations,
         page=page,
-        total_pages=(total + per_page - 1) // per_page,  # Ceiling division
+        total_pages=total_pages,
         filtered=False,  # Indicate that this is not a filtered result
         form_data={
             'budget': None,
@@ -249,9 +535,53 @@ def search_destinations():
     )
 
 
+@app.route('/api/recommendations/batch', methods=['POST'])
+def batch_recommendations():
+    page = request.args.get('page', 1, type=int)
+    size = min(request.args.get('per_page', 100, type=int), batch_max_per_page)
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="the body must be a JSON object"), 400
+    profiles = payload.get('profiles')
+    ranking = payload.get('ranking', 'home')
+    try:
+        if not isinstance(profiles, list):
+            raise ValueError("'profiles' must be a list of preference profiles")
+        if ranking not in ('home', 'suggest'):
+            raise ValueError("'ranking' must be 'home' or 'suggest'")
+        k = min(int(payload.get('k', 10)), batch_max_k)
+        if page < 1 or size < 1 or k < 1:
+            raise ValueError("page, per_page and k must be positive")
+        start = (page - 1) * size
+        page_profiles = [normalize_profile(profile) for profile in profiles[start:start + size]]
+    except (TypeError, ValueError, OverflowError) as e:
+        return jsonify(error=str(e)), 400
+
+    def generate():
+        # Results are written out as each chunk of profiles is scored
+        yield '{"page": %d, "per_page": %d, "total_profiles": %d, "total_pages": %d, "results": [' % (
+            page, size, len(profiles), (len(profiles) + size - 1) // size,
+        )
+        for i, result in enumerate(iter_recommendations(page_profiles, k=k, ranking=ranking)):
+            yield (', ' if i else '') + json.dumps({'index': start + i, **result})
+        yield ']}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def init_database():
+    # Bring the schema and search index up to date; returns True when some
+    # rows have no cluster from the published model
+    db.create_all()
+    upgrade_schema(db.engine, Destination.__table__)
+    with db.engine.begin() as conn:
+        if search_index.ensure_search_index(conn):
+            if conn.execute(db.text(f"SELECT count(*) FROM {search_index.FTS_TABLE}")).scalar() == 0:
+                search_index.rebuild_search_index(conn)
+    return needs_clusters()
+
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
-        if not os.path.exists('clusters.csv'):
-            train_kmeans_model()
+        if init_database():
+            retrainer.request()
     app.run(debug=True)
\ No newline at end of file
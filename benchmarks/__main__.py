@@ -0,0 +1,24 @@
+"""Run the pipeline micro-benchmarks and the route benchmarks in one go.
+
+    python -m benchmarks --sizes 1000 10000 100000 --output results.json
+
+Write one file per commit and diff two of them with benchmarks.compare.
+"""
+import argparse
+
+from benchmarks import micro, routes
+from benchmarks.common import write_results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--requests', type=int, default=500, help="requests per route")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        'micro': micro.run(args.sizes),
+        'routes': routes.run(args.sizes, args.requests),
+    }
+    if args.output:
+        write_results(args.output, 'suite', results)
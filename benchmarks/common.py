@@ -0,0 +1,78 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+def metadata():
+    # Enough to tell which commit and machine produced a result file
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def write_results(path, benchmark, results):
+    with open(path, 'w') as f:
+        json.dump({'benchmark': benchmark, **metadata(), 'results': results}, f, indent=2)
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - started
+
+def latency_summary(latencies, elapsed):
+    ms = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+    }
+
+def child_env(db_path, artifacts_dir, **overrides):
+    # The app reads its configuration at import, so every catalog gets a
+    # fresh interpreter pointed at its own database and model artifacts
+    return {
+        **os.environ,
+        'PYTHONPATH': REPO_ROOT,
+        'DATABASE_URL': f'sqlite:///{db_path}',
+        'MODEL_ARTIFACTS_DIR': artifacts_dir,
+        'TRAVEL_API_CACHE': '',
+        'BACKGROUND_RETRAIN': '0',
+        **overrides,
+    }
+
+def run_child(module, args, cwd, env):
+    # The child prints its result as JSON on the last line of stdout
+    output = subprocess.run(
+        [sys.executable, '-m', module, '--child', *map(str, args)],
+        cwd=cwd,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
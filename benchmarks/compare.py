@@ -0,0 +1,62 @@
+"""Compare two benchmark result files, e.g. from two commits.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+
+Metrics ending in _per_second are better when higher, every other timing or
+memory figure when lower. Exits with status 1 if any metric got worse by
+more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+# Fields that identify a result row rather than measure it
+LABELS = ('benchmark', 'destinations', 'scenario', 'route', 'mode', 'workers', 'module')
+NOT_METRICS = LABELS + ('requests', 'rows', 'errors')
+
+def flatten(data, prefix=''):
+    metrics = {}
+    if isinstance(data, dict) and 'results' in data and 'commit' in data:
+        return flatten(data['results'], data.get('benchmark', ''))
+    if isinstance(data, list):
+        for index, item in enumerate(data):
+            label = None
+            if isinstance(item, dict):
+                label = ' '.join(f'{key}={item[key]}' for key in LABELS if key in item)
+            metrics.update(flatten(item, f'{prefix}[{label or index}]'))
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            if key in NOT_METRICS:
+                continue
+            metrics.update(flatten(value, f'{prefix}.{key}' if prefix else key))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        metrics[prefix] = data
+    return metrics
+
+def compare(before, after, threshold):
+    old, new = flatten(before), flatten(after)
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        worse = -change if name.endswith('_per_second') else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{name}: {old[name]} -> {new[name]} ({change:+.1%}){flag}")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    sys.exit(1 if compare(before, after, args.threshold) else 0)
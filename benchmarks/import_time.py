@@ -0,0 +1,75 @@
+"""Cold import time of the entry points, measured with python -X importtime.
+
+    python -m benchmarks.import_time --repeat 5
+    python -m benchmarks.import_time --check   # fail if serving imports the ML stack
+
+Each module is imported in a fresh interpreter. The serving path (app) and
+the data-only scripts must not pull in scikit-learn, pandas, joblib or the
+plotting and HTTP libraries; --check exits non-zero if one of them does.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import REPO_ROOT, write_results
+
+MODULES = ['models', 'clustering', 'app', 'seed_data', 'retrain', 'migrate', 'visualization']
+# Imported only when training, seeding from the API or drawing plots
+HEAVY = ('sklearn', 'pandas', 'joblib', 'scipy', 'matplotlib', 'seaborn', 'requests', 'urllib3')
+
+def import_once(module):
+    # -X importtime writes "import time: self [us] | cumulative | name" to stderr
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT,
+        env={**os.environ, 'PYTHONPATH': REPO_ROOT, 'BACKGROUND_RETRAIN': '0'},
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    total_us = 0
+    imported = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        imported.add(name.split('.')[0])
+        if name == module:
+            total_us = int(cumulative)
+    return total_us, sorted(imported & set(HEAVY))
+
+def run(modules, repeat):
+    results = []
+    for module in modules:
+        timings, heavy = [], []
+        for _ in range(repeat):
+            total_us, heavy = import_once(module)
+            timings.append(total_us)
+        result = {
+            'module': module,
+            'import_ms': round(statistics.median(timings) / 1000, 1),
+            'heavy_imports': heavy,
+        }
+        results.append(result)
+        print(f"{module:<14} {result['import_ms']:>8.1f} ms  {', '.join(heavy) or '-'}")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--check', action='store_true', help="exit 1 if any of the modules imports a heavy library")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.modules, args.repeat)
+    if args.output:
+        write_results(args.output, 'import_time', results)
+    if args.check:
+        offenders = [result for result in results if result['heavy_imports']]
+        for result in offenders:
+            print(f"{result['module']} imports {', '.join(result['heavy_imports'])}", file=sys.stderr)
+        sys.exit(1 if offenders else 0)
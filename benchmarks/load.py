@@ -0,0 +1,98 @@
+"""Throughput of the production server as the worker count grows.
+
+    python -m benchmarks.load --workers 1 2 4 8 --duration 15
+
+Starts gunicorn (gunicorn.conf.py) once per worker count against the
+configured database and drives it with concurrent keep-alive clients.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = ['/', '/?page=2', '/suggest', '/search']
+
+def wait_until_up(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError("server did not come up")
+
+def drive(port, duration, clients):
+    counts = [0] * clients
+    errors = [0] * clients
+    stop_at = time.monotonic() + duration
+
+    def client(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        i = index
+        while time.monotonic() < stop_at:
+            try:
+                conn.request('GET', PATHS[i % len(PATHS)])
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+            except OSError:
+                errors[index] += 1
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts), sum(errors)
+
+def run(worker_counts, duration, clients, port):
+    results = []
+    for workers in worker_counts:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}'],
+            cwd=REPO_ROOT,
+            env={**os.environ, 'WEB_CONCURRENCY': str(workers)},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(port)
+            requests_done, errors = drive(port, duration, clients)
+        finally:
+            server.terminate()
+            server.wait()
+        result = {
+            'workers': workers,
+            'requests_per_second': round(requests_done / duration, 1),
+            'errors': errors,
+        }
+        results.append(result)
+        print(f"{workers:>3} workers: {result['requests_per_second']:>9.1f} req/s ({errors} errors)")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, os.cpu_count() or 4])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.workers, args.duration, args.clients, args.port)
+    if args.output:
+        write_results(args.output, 'load', results)
@@ -0,0 +1,120 @@
+"""Micro-benchmarks of the recommendation pipeline stages on synthetic catalogs.
+
+    python -m benchmarks.micro --sizes 1000 10000 100000 1000000
+
+Times calculate_score, get_user_cluster (prediction cache hit and miss),
+train_kmeans_model and seed_destinations. Seeding is fed by a stubbed
+TravelAPI, so the network is never touched; it is measured once into an
+empty database and once re-seeding the same, unchanged data.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.common import child_env, run_child, timed, write_results
+
+SCORE_SAMPLE = 10_000
+CLUSTER_CALLS = 1_000
+
+class StubTravelAPI:
+    """Deterministic TripAdvisor-shaped responses in place of TravelAPI."""
+
+    def __init__(self, per_page):
+        self.per_page = per_page
+
+    def fetch_all_destinations(self, geo_ids, pages=1, currency=None):
+        return {
+            (geo_id, page): {'data': {'data': [self.hotel(geo_id, page, i) for i in range(self.per_page)]}}
+            for geo_id in geo_ids
+            for page in range(1, pages + 1)
+        }
+
+    def get_fallback_data(self):
+        return []
+
+    @staticmethod
+    def hotel(geo_id, page, i):
+        price = 15_000 + (i * 7919 + geo_id) % 885_000
+        return {
+            'id': f'{geo_id}-{page}-{i}',
+            'title': f'{i + 1}. Stub Hotel {geo_id}-{page}-{i}',
+            'primaryInfo': 'Free breakfast available' if i % 3 == 0 else None,
+            'bubbleRating': {'rating': None if i % 10 == 0 else (i % 9 + 2) / 2},
+            'priceForDisplay': 'NGN {:,}'.format(price),
+            'cardPhotos': [],
+        }
+
+def bench_stages():
+    from app import app, Destination, calculate_score, get_user_cluster, user_prefs
+    from clustering import model_registry, train_kmeans_model
+
+    with app.app_context():
+        train_seconds = timed(train_kmeans_model)
+
+        destinations = Destination.query.limit(SCORE_SAMPLE).all()
+        score_seconds = timed(lambda: [calculate_score(dest, user_prefs) for dest in destinations])
+
+        get_user_cluster(user_prefs)
+        hit_seconds = timed(lambda: [get_user_cluster(user_prefs) for _ in range(CLUSTER_CALLS)])
+        miss_seconds = 0.0
+        for _ in range(CLUSTER_CALLS):
+            model_registry.predictions.clear()
+            miss_seconds += timed(get_user_cluster, user_prefs)
+
+    return {
+        'train_kmeans_model_seconds': round(train_seconds, 3),
+        'calculate_score_us': round(score_seconds / len(destinations) * 1e6, 3),
+        'get_user_cluster_hit_us': round(hit_seconds / CLUSTER_CALLS * 1e6, 3),
+        'get_user_cluster_miss_us': round(miss_seconds / CLUSTER_CALLS * 1e6, 3),
+    }
+
+def bench_seed(size):
+    from seed_data import seed_destinations
+    from instance.location_map import location_map
+
+    api = StubTravelAPI(per_page=max(1, size // len(location_map)))
+    return {
+        # Includes training the first model for the new rows
+        'seed_destinations_seconds': round(timed(seed_destinations, pages=1, api=api), 3),
+        'reseed_unchanged_seconds': round(timed(seed_destinations, pages=1, api=api), 3),
+    }
+
+def run(sizes):
+    from benchmarks.synthetic import generate_catalog
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            db_path = generate_catalog(os.path.join(workdir, f'catalog_{size}.db'), size)
+            result = run_child(
+                'benchmarks.micro', ['stages', size], workdir,
+                child_env(db_path, os.path.join(workdir, f'artifacts_{size}')),
+            )
+            seed_db = os.path.join(workdir, f'seed_{size}.db')
+            result.update(run_child(
+                'benchmarks.micro', ['seed', size], workdir,
+                child_env(seed_db, os.path.join(workdir, f'seed_artifacts_{size}')),
+            ))
+            result['destinations'] = size
+            results.append(result)
+            print(f"{size:>9}  score {result['calculate_score_us']:>7.2f}us  "
+                  f"cluster hit/miss {result['get_user_cluster_hit_us']:.1f}/{result['get_user_cluster_miss_us']:.1f}us  "
+                  f"train {result['train_kmeans_model_seconds']:.3f}s  "
+                  f"seed {result['seed_destinations_seconds']:.3f}s (unchanged {result['reseed_unchanged_seconds']:.3f}s)")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        stage, size = args.child
+        print(json.dumps(bench_stages() if stage == 'stages' else bench_seed(int(size))))
+    else:
+        results = run(args.sizes)
+        if args.output:
+            write_results(args.output, 'micro', results)
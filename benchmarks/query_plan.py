@@ -0,0 +1,116 @@
+"""Query plans and timings of the catalog queries with and without the SQLite tuning.
+
+    python -m benchmarks.query_plan --size 500000
+
+"before" is the synthetic catalog without the secondary indexes, planner
+statistics or connection pragmas; "after" has the indexes from the
+Destination model, a fresh ANALYZE and app.config['SQLITE_PRAGMAS'].
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import write_results
+
+TUNING_INDEXES = ('ix_destination_climate_budget_rating', 'ix_destination_cluster_version_cluster')
+# Model version the synthetic cluster labels are stored under
+LABEL_VERSION = 'synthetic'
+PREFS = {'budget': 'Medium', 'climate': 'Tropical', 'rating': 4.0}
+
+def catalog_queries(db_path):
+    # Built with the app's own helpers so the SQL matches what the routes run
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    from app import app, db, Destination, DestinationCluster, score_expression, cluster_first, cluster_labels
+
+    def to_sql(query):
+        return str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+
+    with app.app_context():
+        score = score_expression(PREFS)
+        queries = {
+            'home_ranking': db.session.query(Destination.id)
+            .outerjoin(*cluster_labels(LABEL_VERSION))
+            .order_by(cluster_first(2), score.desc(), Destination.id),
+            'suggest_ranking': db.session.query(Destination.id)
+            .join(*cluster_labels(LABEL_VERSION))
+            .filter(DestinationCluster.cluster == 2)
+            .order_by(db.func.coalesce(Destination.rating, 0).desc(), Destination.id),
+            'preference_filter': db.session.query(Destination.id).filter(
+                Destination.climate == PREFS['climate'],
+                Destination.budget_category == PREFS['budget'],
+                Destination.rating >= PREFS['rating'],
+            ),
+            'cluster_count': db.session.query(db.func.count(DestinationCluster.destination_id))
+            .filter(DestinationCluster.model_version == LABEL_VERSION, DestinationCluster.cluster == 2),
+        }
+        sql = {name: to_sql(query) for name, query in queries.items()}
+        pragmas = dict(app.config['SQLITE_PRAGMAS'])
+        db.engine.dispose()
+    return sql, pragmas
+
+def measure(db_path, queries, pragmas, repeat):
+    conn = sqlite3.connect(db_path)
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    results = {}
+    for name, sql in queries.items():
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = conn.execute(sql).fetchall()
+            timings.append(time.perf_counter() - started)
+        results[name] = {
+            'plan': plan,
+            'rows': len(rows),
+            'median_ms': round(statistics.median(timings) * 1000, 2),
+        }
+    conn.close()
+    return results
+
+def run(size, repeat):
+    from benchmarks.synthetic import generate_catalog
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tuned = generate_catalog(os.path.join(workdir, 'tuned.db'), size, label_version=LABEL_VERSION)
+        queries, pragmas = catalog_queries(tuned)
+
+        untuned = os.path.join(workdir, 'untuned.db')
+        shutil.copyfile(tuned, untuned)
+        conn = sqlite3.connect(untuned)
+        for name in TUNING_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.commit()
+        conn.close()
+
+        conn = sqlite3.connect(tuned)
+        conn.execute("ANALYZE")
+        conn.close()
+
+        results = {
+            'destinations': size,
+            'before': measure(untuned, queries, {}, repeat),
+            'after': measure(tuned, queries, pragmas, repeat),
+        }
+
+    for name in queries:
+        before, after = results['before'][name], results['after'][name]
+        print(f"{name}: {before['median_ms']:.2f} ms -> {after['median_ms']:.2f} ms ({after['rows']} rows)")
+        print(f"    before: {'; '.join(before['plan'])}")
+        print(f"    after:  {'; '.join(after['plan'])}")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=500_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.size, args.repeat)
+    if args.output:
+        write_results(args.output, 'query_plan', results)
@@ -0,0 +1,100 @@
+"""Throughput and p50/p99 latency of /, /suggest and /search via the Flask test client.
+
+    python -m benchmarks.routes --sizes 1000 10000 100000 --requests 500
+
+Every route is driven twice per catalog: "cached" with the page cache as
+configured, where repeat visitors are served stored pages, and "uncached"
+with PAGE_CACHE_SIZE=0, so every request is rendered.
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import child_env, latency_summary, run_child, write_results
+from services.feature_encoder import BUDGET_LEVELS, CLIMATES
+
+PAGES = 10
+PREFERENCES = list(itertools.product(
+    BUDGET_LEVELS, CLIMATES, ['1', '3', '4', '5'],
+))
+SEARCH_TERMS = ['Lagos', 'Abuja', 'hotel', 'breakfast', 'pool', 'Synthetic Hotel 1', '']
+
+def home_request(client, i):
+    return client.get(f'/?page={i % PAGES + 1}')
+
+def suggest_request(client, i):
+    budget, weather, rating = PREFERENCES[i % len(PREFERENCES)]
+    return client.post(
+        f'/suggest?page={i // len(PREFERENCES) % PAGES + 1}',
+        data={'budget': budget, 'weather': weather, 'rating': rating},
+    )
+
+def search_request(client, i):
+    return client.post(
+        f'/search?page={i // len(SEARCH_TERMS) % PAGES + 1}',
+        data={'search_term': SEARCH_TERMS[i % len(SEARCH_TERMS)]},
+    )
+
+ROUTES = {'/': home_request, '/suggest': suggest_request, '/search': search_request}
+
+def drive(requests_per_route):
+    from app import app, init_database
+    from clustering import train_kmeans_model
+
+    with app.app_context():
+        init_database()
+        train_kmeans_model()
+
+    client = app.test_client()
+    results = []
+    for route, make_request in ROUTES.items():
+        make_request(client, 0)  # Warm up
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        for i in range(requests_per_route):
+            request_started = time.perf_counter()
+            response = make_request(client, i)
+            latencies.append(time.perf_counter() - request_started)
+            if response.status_code != 200:
+                errors += 1
+        result = latency_summary(latencies, time.perf_counter() - started)
+        result.update({'route': route, 'errors': errors})
+        results.append(result)
+    return results
+
+def run(sizes, requests_per_route):
+    from benchmarks.synthetic import generate_catalog
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            db_path = generate_catalog(os.path.join(workdir, f'catalog_{size}.db'), size)
+            for scenario, overrides in (('cached', {}), ('uncached', {'PAGE_CACHE_SIZE': '0'})):
+                env = child_env(db_path, os.path.join(workdir, f'artifacts_{size}'), **overrides)
+                for result in run_child('benchmarks.routes', [requests_per_route], workdir, env):
+                    result.update({'destinations': size, 'scenario': scenario})
+                    results.append(result)
+                    print(f"{size:>9} {scenario:<9} {result['route']:<9} "
+                          f"{result['requests_per_second']:>8.1f} req/s  "
+                          f"p50 {result['p50_ms']:>8.3f} ms  p99 {result['p99_ms']:>8.3f} ms"
+                          + (f"  ({result['errors']} errors)" if result['errors'] else ''))
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--requests', type=int, default=500, help="requests per route")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(drive(args.child)))
+    else:
+        results = run(args.sizes, args.requests)
+        if args.output:
+            write_results(args.output, 'routes', results)
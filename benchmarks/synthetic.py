@@ -0,0 +1,67 @@
+import random
+
+from sqlalchemy import create_engine
+
+from instance.location_map import location_map
+
+BUDGET_PRICE_RANGES = {
+    'Low': (15_000, 50_000),
+    'Medium': (50_000, 200_000),
+    'High': (200_000, 900_000),
+}
+
+def synthetic_rows(n, seed=42):
+    # Destinations shaped like the seeded ones: real cities and climates,
+    # prices consistent with their budget category
+    rng = random.Random(seed)
+    cities = list(location_map.items())
+    for i in range(1, n + 1):
+        city, city_data = rng.choice(cities)
+        budget_category = rng.choice(list(BUDGET_PRICE_RANGES))
+        price_ngn = rng.randint(*BUDGET_PRICE_RANGES[budget_category])
+        yield {
+            'id': i,
+            'external_id': f'synthetic-{i}',
+            'name': f'Synthetic Hotel {i}',
+            'city': city,
+            'climate': city_data['climate'],
+            'budget_category': budget_category,
+            'info': rng.choice(['Free breakfast available', 'Pool on site', 'No additional info']),
+            'rating': rng.choice([None] + [r / 2 for r in range(2, 11)]),
+            'price': 'NGN {:,}'.format(price_ngn),
+            'price_ngn': price_ngn,
+            'price_display': 'NGN {:,}'.format(price_ngn),
+            'image_url': None,
+        }
+
+def insert_chunked(conn, insert, rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            conn.execute(insert, chunk)
+            chunk = []
+    if chunk:
+        conn.execute(insert, chunk)
+
+def generate_catalog(path, n, seed=42, chunk_size=50_000, label_version=None):
+    """Create a SQLite database at `path` holding `n` synthetic destinations.
+
+    With `label_version`, every destination also gets a random cluster label
+    stored under that model version.
+    """
+    from models import Destination, DestinationCluster
+
+    engine = create_engine(f'sqlite:///{path}')
+    Destination.metadata.create_all(engine)
+    with engine.begin() as conn:
+        insert_chunked(conn, Destination.__table__.insert(), synthetic_rows(n, seed), chunk_size)
+        if label_version is not None:
+            rng = random.Random(seed)
+            labels = (
+                {'model_version': label_version, 'destination_id': i, 'cluster': rng.randrange(5)}
+                for i in range(1, n + 1)
+            )
+            insert_chunked(conn, DestinationCluster.__table__.insert(), labels, chunk_size)
+    engine.dispose()
+    return path
@@ -0,0 +1,105 @@
+"""Fit time and peak RSS of train_kmeans_model on synthetic catalogs.
+
+    python -m benchmarks.train_benchmark --sizes 10000 100000 1000000
+
+Every (size, mode) run happens in a fresh subprocess so peak RSS is not
+polluted by earlier runs. The baseline is taken after scikit-learn and
+pandas are imported, and SQLite runs without mmap so the database file's
+pages don't count towards RSS; the growth is what training allocates.
+fit_seconds is KMeans.fit alone, total_seconds all of train_kmeans_model
+(loading features, fitting, storing labels and publishing).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def time_fits(cls, timings):
+    fit = cls.fit
+
+    def timed_fit(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fit(self, *args, **kwargs)
+        finally:
+            timings.append(time.perf_counter() - started)
+    cls.fit = timed_fit
+
+def run_child(db_path, mode):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    # Imported up front so they are part of the baseline, not of training
+    import pandas
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+    from models import app
+    from clustering import train_kmeans_model
+
+    app.config['SQLITE_PRAGMAS'] = {**app.config['SQLITE_PRAGMAS'], 'mmap_size': 0}
+    fits = []
+    time_fits(KMeans, fits)
+    time_fits(MiniBatchKMeans, fits)
+
+    with app.app_context():
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        train_kmeans_model(mode=mode)
+        elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'mode': mode,
+        'fit_seconds': round(sum(fits), 3),
+        'total_seconds': round(elapsed, 3),
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }))
+
+def run(sizes, modes):
+    from benchmarks.synthetic import generate_catalog
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            db_path = generate_catalog(os.path.join(workdir, f'catalog_{size}.db'), size)
+            for mode in modes:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.train_benchmark', '--child', db_path, '--modes', mode],
+                    cwd=workdir,
+                    env={**os.environ, 'PYTHONPATH': REPO_ROOT},
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                result['destinations'] = size
+                results.append(result)
+                print(f"{size:>9} {mode:<9} fit {result['fit_seconds']:>8.3f}s  "
+                      f"total {result['total_seconds']:>8.3f}s  "
+                      f"peak RSS {result['peak_rss_mb']:>8.1f} MB (baseline {result['baseline_rss_mb']:.1f} MB)")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--modes', nargs='+', default=['full', 'minibatch'])
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.modes[0])
+    else:
+        results = run(args.sizes, args.modes)
+        if args.output:
+            write_results(args.output, 'train', results)
@@ -0,0 +1,154 @@
+# Training, storing and predicting destination clusters. scikit-learn and
+# pandas are imported by train_kmeans_model only; everything else predicts
+# from the published centroids with NumPy.
+from models import app, db, Destination, DestinationCluster, bump_data_version
+from services.feature_encoder import BUDGET_LEVELS, CLIMATES, encode
+from services.model_registry import ModelRegistry
+import itertools
+import os
+import numpy as np
+
+model_registry = ModelRegistry(os.getenv('MODEL_ARTIFACTS_DIR', 'artifacts'))
+# Ratings offered by the filter form; used to precompute the prediction cache
+rating_choices = (1.0, 2.0, 3.0, 4.0, 5.0)
+
+def load_feature_matrix(*filters, chunk_size=None):
+    # Stream rows in chunks straight into preallocated float32 arrays instead
+    # of materialising ORM objects, dicts and a DataFrame for the whole table
+    chunk_size = chunk_size or app.config['TRAINING_CHUNK_SIZE']
+    total = db.session.query(db.func.count(Destination.id)).filter(*filters).scalar()
+    ids = np.empty(total, dtype=np.int64)
+    X = np.empty((total, 3), dtype=np.float32)
+
+    n = 0
+    result = db.session.execute(
+        db.select(Destination.id, Destination.budget_category, Destination.climate, Destination.rating)
+        .filter(*filters)
+        .order_by(Destination.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for chunk in result.partitions():
+        if n + len(chunk) > len(ids):
+            # Rows were added after the count
+            ids = np.resize(ids, n + len(chunk))
+            X = np.resize(X, (n + len(chunk), 3))
+        chunk_ids, budgets, climates, ratings = zip(*chunk)
+        ids[n:n + len(chunk)] = chunk_ids
+        encode(budgets, climates, ratings, out=X[n:n + len(chunk)])
+        n += len(chunk)
+    return ids[:n], X[:n]
+
+def store_cluster_labels(version, ids, labels, chunk_size=None):
+    # Store assignments under the model version that produced them so routes
+    # can filter on them in SQL; the caller commits
+    chunk_size = chunk_size or app.config['TRAINING_CHUNK_SIZE']
+    for start in range(0, len(ids), chunk_size):
+        db.session.execute(
+            db.insert(DestinationCluster),
+            [{'model_version': version, 'destination_id': int(i), 'cluster': int(c)}
+             for i, c in zip(ids[start:start + chunk_size], labels[start:start + chunk_size])],
+        )
+
+def prune_cluster_labels():
+    # Labels of versions the registry no longer keeps, including fits that
+    # never got published
+    db.session.execute(
+        db.delete(DestinationCluster)
+        .where(DestinationCluster.model_version.notin_(model_registry.published_versions()))
+    )
+    db.session.commit()
+
+def unlabelled(version):
+    return ~db.exists().where(
+        DestinationCluster.destination_id == Destination.id,
+        DestinationCluster.model_version == version,
+    )
+
+def needs_clusters():
+    # True when some destination has no label from the published model
+    manifest = model_registry.read_manifest()
+    query = Destination.query
+    if manifest is not None:
+        query = query.filter(unlabelled(manifest['version']))
+    return query.first() is not None
+
+def train_kmeans_model(mode=None):
+    import pandas as pd
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+
+    ids, X = load_feature_matrix()
+
+    if len(ids) == 0:
+        return None, None, None
+
+    mode = mode or app.config['KMEANS_MODE']
+    if mode == 'auto':
+        mode = 'minibatch' if len(ids) >= app.config['KMEANS_MINIBATCH_THRESHOLD'] else 'full'
+
+    # Scale in place; X is ours and never used unscaled again
+    scaler = StandardScaler(copy=False)
+    X = scaler.fit_transform(X)
+    if mode == 'minibatch':
+        model = MiniBatchKMeans(n_clusters=5, random_state=42, batch_size=4096, n_init=3)
+    else:
+        model = KMeans(n_clusters=5, random_state=42)
+    model.fit(X)
+    labels = model.labels_
+
+    clusters = pd.DataFrame({'id': ids, 'cluster': labels})
+
+    # The labels are committed under the new version before the manifest
+    # names it, so nothing reads them until the model they belong to is served
+    version = model_registry.new_version()
+    store_cluster_labels(version, ids, labels)
+    db.session.commit()
+    try:
+        snapshot = model_registry.publish(model, scaler, clusters, version=version)
+    except Exception:
+        db.session.rollback()
+        db.session.execute(db.delete(DestinationCluster).where(DestinationCluster.model_version == version))
+        db.session.commit()
+        raise
+    prune_cluster_labels()
+    warm_prediction_cache(snapshot)
+
+    return model, scaler, clusters
+
+def assign_missing_clusters():
+    # New or changed rows get their cluster from the current model; only a
+    # missing model forces a full retrain
+    snapshot = model_registry.get()
+    if snapshot is None:
+        train_kmeans_model()
+        return None
+
+    ids, X = load_feature_matrix(unlabelled(snapshot.artifact_version))
+    if len(ids) == 0:
+        return 0
+
+    labels = snapshot.model.predict(snapshot.scaler.transform(X))
+    store_cluster_labels(snapshot.artifact_version, ids, labels)
+    bump_data_version()
+    db.session.commit()
+    return len(ids)
+
+def preference_matrix(prefs_list):
+    return encode(
+        [prefs['budget'] for prefs in prefs_list],
+        [prefs['climate'] for prefs in prefs_list],
+        [float(prefs['rating']) for prefs in prefs_list],
+    )
+
+def preference_key(user_prefs):
+    return (user_prefs['budget'], user_prefs['climate'], float(user_prefs['rating']))
+
+def warm_prediction_cache(snapshot):
+    # The form only offers a few dozen combinations, so predict all of them in one call
+    prefs_list = [
+        {'budget': budget, 'climate': climate, 'rating': rating}
+        for budget, climate, rating in itertools.product(BUDGET_LEVELS, CLIMATES, rating_choices)
+    ]
+    labels = snapshot.model.predict(snapshot.scaler.transform(preference_matrix(prefs_list)))
+    for prefs, label in zip(prefs_list, labels):
+        model_registry.predictions.put(snapshot.version, preference_key(prefs), int(label))
@@ -0,0 +1,13 @@
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:application'
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('WEB_THREADS', 1))
+# Load the app, model and caches once in the master and fork workers from it
+preload_app = True
+
+def post_fork(server, worker):
+    from wsgi import after_fork
+    after_fork()
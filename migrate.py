@@ -0,0 +1,48 @@
+from models import app, db, Destination, analyze_database, bump_data_version
+from clustering import needs_clusters, train_kmeans_model
+from seed_data import clean_name, parse_price, format_price
+from services.schema import upgrade_schema
+from services import search_index
+
+def backfill_display_fields():
+    # Rows seeded before the display columns existed still carry the raw API
+    # values. Those are the only ones with neither a display price nor a
+    # content hash; every later seed stores the name already cleaned, and
+    # cleaning it again would eat into names that start with a number
+    updated = 0
+    for dest in Destination.query.yield_per(500):
+        legacy = dest.price_display is None and dest.content_hash is None
+        name = clean_name(dest.name) if legacy else dest.name
+        price_ngn = parse_price(dest.price)
+        price_display = format_price(price_ngn, dest.price)
+        if (name, price_ngn, price_display) != (dest.name, dest.price_ngn, dest.price_display):
+            dest.name = name
+            dest.price_ngn = price_ngn
+            dest.price_display = price_display
+            updated += 1
+    if updated:
+        bump_data_version()
+    db.session.commit()
+    return updated
+
+def migrate():
+    with app.app_context():
+        db.create_all()
+        upgrade_schema(db.engine, Destination.__table__)
+        updated = backfill_display_fields()
+        print(f"Backfilled display fields for {updated} destinations.")
+
+        with db.engine.begin() as conn:
+            if search_index.ensure_search_index(conn):
+                search_index.rebuild_search_index(conn)
+                print("Search index rebuilt.")
+
+        # Databases created before the labels were versioned have none yet
+        if needs_clusters():
+            train_kmeans_model()
+            print("Cluster assignments rebuilt.")
+
+        analyze_database()
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,112 @@
+# The Flask app, its database and the catalog models, without the web
+# routes or the ML stack, for scripts that only need the data
+from dotenv import load_dotenv
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from services import search_index
+import os
+import time
+
+load_dotenv()
+
+app = Flask(__name__)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///travel.db')
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 'full' (KMeans), 'minibatch' (MiniBatchKMeans) or 'auto' to pick by catalog size
+app.config['KMEANS_MODE'] = os.getenv('KMEANS_MODE', 'auto')
+app.config['KMEANS_MINIBATCH_THRESHOLD'] = int(os.getenv('KMEANS_MINIBATCH_THRESHOLD', 50_000))
+app.config['TRAINING_CHUNK_SIZE'] = int(os.getenv('TRAINING_CHUNK_SIZE', 10_000))
+# Retrain on a background thread when no model is published; production
+# workers turn this off and leave training to retrain.py
+app.config['BACKGROUND_RETRAIN'] = os.getenv('BACKGROUND_RETRAIN', '1') == '1'
+# Read-only connections (set in forked production workers)
+app.config['DATABASE_READONLY'] = os.getenv('DATABASE_READONLY') == '1'
+# Applied to every new SQLite connection
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': 'WAL',  # Readers keep going while seeding or retraining writes
+    'synchronous': 'NORMAL',  # Safe with WAL; skips an fsync per commit
+    'cache_size': -64000,  # Negative means KiB: ~64 MB page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+db = SQLAlchemy(app)
+
+# Database Models
+class Destination(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # TripAdvisor hotel id; the stable key seeding upserts on
+    external_id = db.Column(db.String(64), unique=True, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    city = db.Column(db.String(100), nullable=False)
+    climate = db.Column(db.String(50))
+    budget_category = db.Column(db.String(20))
+    info = db.Column(db.String(255))
+    rating = db.Column(db.Float)
+    price = db.Column(db.String(50))
+    price_ngn = db.Column(db.Integer)
+    price_display = db.Column(db.String(50))
+    image_url = db.Column(db.String(500))
+    # Hash of the ingested fields, used to skip unchanged rows when reseeding
+    content_hash = db.Column(db.String(64))
+
+    __table_args__ = (
+        db.Index('ix_destination_climate_budget_rating', 'climate', 'budget_category', 'rating'),
+    )
+
+class DestinationCluster(db.Model):
+    # Cluster assignments per published model version. Label numbers only
+    # mean something to the fit that produced them, so every query reads the
+    # labels of the model it serves, and a new fit's labels stay invisible
+    # until its version is published
+    __tablename__ = 'destination_cluster'
+    model_version = db.Column(db.String(64), primary_key=True)
+    destination_id = db.Column(db.Integer, primary_key=True)
+    cluster = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_destination_cluster_version_cluster', 'model_version', 'cluster'),
+    )
+
+search_index.register_search_sync(Destination)
+
+def configure_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    if app.config['DATABASE_READONLY']:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+with app.app_context():
+    event.listen(db.engine, 'connect', configure_connection)
+
+class CatalogMeta(db.Model):
+    # 'data_version' is bumped whenever destinations or the served clusters change,
+    # so every process can tell its cached rankings are out of date
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# How often (in seconds) a process re-reads the data version
+data_version_check_interval = 1.0
+data_version_state = {'value': 0, 'checked_at': 0.0}
+
+def bump_data_version():
+    # Part of the caller's transaction, so the bump commits with the change
+    stmt = sqlite_insert(CatalogMeta).values(key='data_version', value=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[CatalogMeta.key], set_={'value': CatalogMeta.value + 1}
+    ))
+
+def current_data_version():
+    now = time.monotonic()
+    if now - data_version_state['checked_at'] >= data_version_check_interval:
+        data_version_state['value'] = db.session.query(CatalogMeta.value).filter_by(key='data_version').scalar() or 0
+        data_version_state['checked_at'] = now
+    return data_version_state['value']
+
+def analyze_database():
+    # Refresh the planner statistics after bulk changes so it picks the indexes
+    with db.engine.begin() as conn:
+        conn.execute(db.text("ANALYZE"))
@@ -0,0 +1,16 @@
+from models import app
+from clustering import train_kmeans_model, model_registry
+
+def retrain():
+    # Trains off the request path; running servers pick the new version up
+    # from the manifest without a restart
+    with app.app_context():
+        model, scaler, clusters = train_kmeans_model()
+        if model is None:
+            print("No destinations to train on. Seed the database first.")
+            return
+        snapshot = model_registry.get()
+        print(f"Published model {snapshot.artifact_version} trained on {len(clusters)} destinations.")
+
+if __name__ == '__main__':
+    retrain()
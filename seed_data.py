@@ -1,68 +1,188 @@
-from app import app, db, Destination
+import argparse
+import hashlib
+import json
+import os
+import re
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import app, db, Destination, DestinationCluster, analyze_database, bump_data_version
+from clustering import assign_missing_clusters
+from services.schema import upgrade_schema
+from services import search_index
 from services.api_service import TravelAPI
 from instance.location_map import location_map
 
-def get_budget_category(price_str):
+# Fields whose change means a destination has to be rewritten and reclustered
+CONTENT_COLUMNS = [
+    'name', 'city', 'climate', 'budget_category', 'info', 'rating',
+    'price', 'price_ngn', 'price_display', 'image_url',
+]
+BATCH_SIZE = 500
+
+def clean_name(title):
+    # Drop the "1. " ranking prefix TripAdvisor puts in front of hotel titles
+    return re.sub(r'^\s*\d+[\.\-\s]*', '', title) if title else title
+
+def parse_price(price_str):
     # Remove "NGN", commas, etc.
-    if not price_str:
-        return "Unknown"
+    if not price_str or not isinstance(price_str, str):
+        return None
     try:
-        amount = int(price_str.replace("NGN", "").replace(",", "").strip())
-        if amount < 50_000:
-            return "Low"
-        elif amount < 200_000:
-            return "Medium"
-        else:
-            return "High"
+        return int(price_str.replace("NGN", "").replace(",", "").strip())
     except ValueError:
+        return None
+
+def format_price(amount, fallback=None):
+    return "NGN {:,}".format(amount) if amount else fallback
+
+def get_budget_category(price_str):
+    amount = parse_price(price_str)
+    if amount is None:
         return "Unknown"
+    if amount < 50_000:
+        return "Low"
+    elif amount < 200_000:
+        return "Medium"
+    else:
+        return "High"
 
-def seed_destinations():
-    api = TravelAPI()
+def seed_destinations(pages=None, api=None):
+    api = api or TravelAPI()
+    pages = pages or int(os.getenv('SEED_PAGES', 1))
     
     destinations_data = []
 
+    # Fetch every city and page concurrently, then process them in map order
+    responses = api.fetch_all_destinations(
+        [city_data['geoId'] for city_data in location_map.values()], pages=pages, currency='NGN'
+    )
+
+    failed = []
     for city_key, city_data in location_map.items():
-        # Fetch destinations from API for each combination
-        response = api.fetch_destinations(geoId=city_data['geoId'], page=1, currency='NGN')
-        # Extract actual results list
-        results = response.get('data', {}).get('data', [])
-        # Add city information to each destination
-        for result in results:
-            result['city'] = city_key
-            result['climate'] = city_data['climate']
-            result['budget_category'] = get_budget_category(result.get('priceForDisplay', {}))
-            photos = result.get('cardPhotos', [])
-            result['image_url'] = photos[0].get('sizes', {}).get('urlTemplate').replace("{width}", "800").replace("{height}", "800") if photos else None
-        destinations_data.extend(results)
+        for page in range(1, pages + 1):
+            response = responses.get((city_data['geoId'], page))
+            if response is None:
+                # Timed out or errored after its retries; this page's destinations are unknown
+                failed.append((city_key, page))
+                response = {}
+            # Extract actual results list
+            results = response.get('data', {}).get('data', [])
+            # Add city information to each destination
+            for result in results:
+                result['city'] = city_key
+                result['climate'] = city_data['climate']
+                result['budget_category'] = get_budget_category(result.get('priceForDisplay', {}))
+                photos = result.get('cardPhotos', [])
+                result['image_url'] = photos[0].get('sizes', {}).get('urlTemplate').replace("{width}", "800").replace("{height}", "800") if photos else None
+            destinations_data.extend(results)
+
+
+    if failed:
+        print(f"Failed to fetch {len(failed)} of {len(location_map) * pages} city pages: "
+              + ", ".join(f"{city} page {page}" for city, page in failed))
 
-        
+    # Only a fetch where every city page succeeded may remove destinations
+    # that disappeared; otherwise a failed city would lose its whole catalog
+    prune = len(destinations_data) > 0 and not failed
+    if failed and destinations_data:
+        print("Skipping removal of missing destinations until every page fetches successfully.")
 
     if len(destinations_data) == 0:
         print("No data fetched from API. Please check the API or your internet connection.")
         results = api.get_fallback_data()
         destinations_data.extend(results)
 
+    rows = {}
+    for dest_data in destinations_data:
+        if not dest_data.get('title'):
+            continue
+        row = destination_row(dest_data)
+        rows[row['external_id']] = row
+
     with app.app_context():
-        # Clear existing data
-        db.session.query(Destination).delete()
-        
-        # Add new destinations from API
-        for dest_data in destinations_data:
-            destination = Destination(
-                name=dest_data.get('title'),
-                city=dest_data.get('city'),
-                climate=dest_data.get('climate'),
-                budget_category=dest_data.get('budget_category'),
-                info=dest_data.get('primaryInfo') or "No additional info",
-                rating=dest_data.get('bubbleRating', {}).get('rating'),
-                price=dest_data.get('priceForDisplay', {}),
-                image_url=dest_data.get('image_url', None),
-            )
-            db.session.add(destination)
-        
+        db.create_all()
+        upgrade_schema(db.engine, Destination.__table__)
+        search_index.ensure_search_index(db.session.connection())
+
+        written, removed = upsert_destinations(list(rows.values()), prune=prune)
+        if written or removed:
+            bump_data_version()
         db.session.commit()
-        print(f"Database seeded successfully with {len(destinations_data)} destinations!")
+        print(f"Database seeded successfully: {written} new or changed, {removed} removed, "
+              f"{len(rows) - written} unchanged destinations!")
+
+        # Only new or changed rows need a cluster; the model is kept
+        assign_missing_clusters()
+        analyze_database()
+
+def destination_row(dest_data):
+    price = dest_data.get('priceForDisplay', {})
+    price = price if isinstance(price, str) else None
+    price_ngn = parse_price(price)
+    name = clean_name(dest_data.get('title'))
+    row = {
+        'external_id': str(dest_data.get('id') or f"{dest_data.get('city')}:{name}"),
+        'name': name,
+        'city': dest_data.get('city'),
+        'climate': dest_data.get('climate'),
+        'budget_category': dest_data.get('budget_category'),
+        'info': dest_data.get('primaryInfo') or "No additional info",
+        'rating': (dest_data.get('bubbleRating') or {}).get('rating'),
+        'price': price,
+        'price_ngn': price_ngn,
+        'price_display': format_price(price_ngn, price),
+        'image_url': dest_data.get('image_url', None),
+    }
+    row['content_hash'] = content_hash(row)
+    return row
+
+def content_hash(row):
+    payload = json.dumps([row[column] for column in CONTENT_COLUMNS], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def upsert_destinations(rows, prune=True, batch_size=BATCH_SIZE):
+    existing = dict(
+        db.session.query(Destination.external_id, Destination.content_hash)
+        .filter(Destination.external_id.isnot(None))
+    )
+    changed = [row for row in rows if existing.get(row['external_id']) != row['content_hash']]
+
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        stmt = sqlite_insert(Destination).values(batch)
+        update_columns = {column: stmt.excluded[column] for column in CONTENT_COLUMNS + ['content_hash']}
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[Destination.external_id],
+            set_=update_columns,
+            where=Destination.content_hash.is_distinct_from(stmt.excluded.content_hash),
+        ))
+        # Bulk statements bypass the model events that keep the search index in sync
+        ids = [row_id for (row_id,) in db.session.query(Destination.id).filter(
+            Destination.external_id.in_([row['external_id'] for row in batch])
+        )]
+        search_index.reindex_rows(db.session.connection(), ids)
+        # Reassigned by assign_missing_clusters
+        delete_cluster_labels(ids)
+
+    removed = 0
+    if prune:
+        seen = {row['external_id'] for row in rows}
+        stale = [row_id for row_id, external_id in db.session.query(Destination.id, Destination.external_id)
+                 if external_id is None or external_id not in seen]
+        for start in range(0, len(stale), batch_size):
+            batch = stale[start:start + batch_size]
+            Destination.query.filter(Destination.id.in_(batch)).delete(synchronize_session=False)
+            search_index.reindex_rows(db.session.connection(), batch)
+            delete_cluster_labels(batch)
+        removed = len(stale)
+
+    return len(changed), removed
+
+def delete_cluster_labels(ids):
+    # Labels of every model version, so no version serves a stale assignment
+    db.session.execute(db.delete(DestinationCluster).where(DestinationCluster.destination_id.in_(ids)))
 
 if __name__ == '__main__':
-    seed_destinations()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the destination catalog from the TripAdvisor API")
+    parser.add_argument('--pages', type=int, default=None, help="result pages to fetch per city (default: $SEED_PAGES or 1)")
+    args = parser.parse_args()
+    seed_destinations(pages=args.pages)
\ No newline at end of file
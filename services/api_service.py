@@ -1,43 +1,200 @@
+import logging
 import os
-import requests
-from dotenv import load_dotenv
-from typing import List, Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.response_cache import ResponseCache
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import datetime, timedelta
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+SEARCH_HOTELS_ENDPOINT = "/api/v1/hotels/searchHotels"
+# Check in today for a one-week stay
+STAY_NIGHTS = 7
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second in bursts of `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return  # Rate limiting disabled
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def rate_limited_retry(rate_limiter, **kwargs):
+    # urllib3 repeats failed requests inside session.get, past our own
+    # acquire(); taking a token before every repeat keeps a burst of 5xx
+    # responses within the rate limit too
+    from urllib3.util.retry import Retry
+
+    class RateLimitedRetry(Retry):
+        def sleep(self, response=None):
+            super().sleep(response)
+            rate_limiter.acquire()
+
+    return RateLimitedRetry(**kwargs)
 
 class TravelAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        rate_limit: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retries: int = 3,
+        cache: Optional[ResponseCache] = None,
+        offline: Optional[bool] = None,
+        stale_while_revalidate: Optional[bool] = None,
+    ):
+        # The HTTP stack and .env loading are only needed once a client is
+        # built, so importing this module stays cheap for the web workers
+        import requests
+        from dotenv import load_dotenv
+        from requests.adapters import HTTPAdapter
+
+        load_dotenv()
         self.api_key = os.getenv('RAPIDAPI_KEY')
-        self.base_url = "https://tripadvisor16.p.rapidapi.com"
+        # Point base_url at a local stub server to run the ingestion offline
+        self.base_url = base_url or os.getenv('RAPIDAPI_BASE_URL', "https://tripadvisor16.p.rapidapi.com")
         self.headers = {
             "X-RapidAPI-Key": self.api_key,
             "X-RapidAPI-Host": "tripadvisor16.p.rapidapi.com"
         }
+        self.timeout = timeout if timeout is not None else float(os.getenv('RAPIDAPI_TIMEOUT', 10))
+        self.max_workers = max_workers or int(os.getenv('RAPIDAPI_MAX_WORKERS', 8))
+        self.rate_limiter = TokenBucket(
+            rate_limit if rate_limit is not None else float(os.getenv('RAPIDAPI_RATE_LIMIT', 5))
+        )
+
+        # One keep-alive pool shared by every worker thread
+        retry = rate_limited_retry(
+            self.rate_limiter,
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Responses are cached on disk unless TRAVEL_API_CACHE is set to an empty string
+        cache_path = os.getenv('TRAVEL_API_CACHE', 'instance/api_cache.db')
+        if cache is None and cache_path:
+            cache = ResponseCache(cache_path, ttl=float(os.getenv('TRAVEL_API_CACHE_TTL', 24 * 3600)))
+        self.cache = cache
+        # Offline mode only ever serves cached responses, however old
+        self.offline = offline if offline is not None else os.getenv('TRAVEL_API_OFFLINE') == '1'
+        # Serve stale entries at once and refresh them in the background for
+        # the next caller. Off by default: a one-shot seed would otherwise
+        # always store the stale copy and only refresh it for the next run
+        self.stale_while_revalidate = (
+            stale_while_revalidate if stale_while_revalidate is not None
+            else os.getenv('TRAVEL_API_STALE_WHILE_REVALIDATE') == '1'
+        )
+        self._refresh_pool = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
 
     def fetch_destinations(self, geoId: Optional[int] = None, page: Optional[int] = None, currency: Optional[str] = None) -> List[Dict]:
+        key = ResponseCache.make_key(
+            SEARCH_HOTELS_ENDPOINT, geoId=geoId, page=page, currency=currency, check_in_offset=0, nights=STAY_NIGHTS
+        )
+        cached = None
+        if self.cache is not None:
+            cached, age = self.cache.get(key, expire=not self.offline)
+            if cached is not None:
+                if self.offline or self.cache.is_fresh(age):
+                    return cached
+                if self.stale_while_revalidate:
+                    # Serve the stale copy now and refresh it in the background
+                    self._refresh_in_background(key, geoId, page, currency)
+                    return cached
+        if self.offline:
+            return None
+        response = self._fetch_and_store(key, geoId, page, currency)
+        # A stale copy still beats nothing when the refetch fails
+        return response if response is not None else cached
+
+    def _fetch_and_store(self, key, geoId, page, currency):
+        response = self._request_destinations(geoId, page, currency)
+        if response is not None and self.cache is not None:
+            self.cache.set(key, response)
+        return response
+
+    def _refresh_in_background(self, key, geoId, page, currency):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(max_workers=2)
+
+        def refresh():
+            try:
+                self._fetch_and_store(key, geoId, page, currency)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+
+    def _request_destinations(self, geoId, page, currency):
+        import requests
+
         try:
             # Get current date for check-in and check-out dates
             check_in = datetime.now().strftime("%Y-%m-%d")
-            check_out = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+            check_out = (datetime.now() + timedelta(days=STAY_NIGHTS)).strftime("%Y-%m-%d")
             
-            response = requests.get(
-                f"{self.base_url}/api/v1/hotels/searchHotels",
-                headers=self.headers,
+            self.rate_limiter.acquire()
+            response = self.session.get(
+                f"{self.base_url}{SEARCH_HOTELS_ENDPOINT}",
                 params={
                     "geoId": geoId,
                     "checkIn": check_in,
                     "checkOut": check_out,
                     "pageNumber": page,
                     "currencyCode": currency,
-                }
+                },
+                timeout=self.timeout,
             )
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
-            print(f"API request failed: {e}")
+            logger.warning("API request failed: %s", e)
             # Return some fallback data in case of API failure
             return 
+
+    def fetch_all_destinations(self, geo_ids: Iterable[int], pages: int = 1, currency: Optional[str] = None) -> Dict[Tuple[int, int], Optional[Dict]]:
+        # Fetch every (geoId, page) pair concurrently; the rate limiter keeps
+        # the pool within the API quota
+        jobs = [(geo_id, page) for geo_id in geo_ids for page in range(1, pages + 1)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            responses = pool.map(
+                lambda job: self.fetch_destinations(geoId=job[0], page=job[1], currency=currency),
+                jobs,
+            )
+            return dict(zip(jobs, responses))
         
     def get_fallback_data(self) -> List[Dict]:
         # Fallback data in case the API is unavailable
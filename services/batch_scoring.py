@@ -0,0 +1,112 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Column arrays of the whole catalog, ordered by id. Climate and budget are
+# stored as codes into their vocabularies so comparisons are integer ops.
+Catalog = namedtuple('Catalog', ['ids', 'climates', 'climate_codes', 'budgets', 'budget_codes', 'ratings', 'clusters'])
+
+NO_CLUSTER = -1
+# Scores are at most 100.00, i.e. 10000 cents
+MAX_SCORE_CENTS = 10_000
+# Profiles are scored in chunks of at most this many profile x destination cells
+CHUNK_CELLS = 4_000_000
+
+
+def _factorize(values):
+    # NULL gets a code of its own that no profile value maps to, since
+    # NULL = 'x' is never true in SQL either
+    vocab = {}
+    codes = np.fromiter(
+        (-2 if value is None else vocab.setdefault(value, len(vocab)) for value in values),
+        dtype=np.int32, count=len(values),
+    )
+    return list(vocab), codes
+
+
+def build_catalog(rows):
+    """Build a Catalog from (id, climate, budget_category, rating, cluster) rows sorted by id."""
+    ids, climates, budgets, ratings, clusters = zip(*rows) if rows else ((),) * 5
+    climate_vocab, climate_codes = _factorize(climates)
+    budget_vocab, budget_codes = _factorize(budgets)
+    return Catalog(
+        ids=np.array(ids, dtype=np.int64),
+        climates=climate_vocab,
+        climate_codes=climate_codes,
+        budgets=budget_vocab,
+        budget_codes=budget_codes,
+        # NULL ratings become NaN
+        ratings=np.array(ratings, dtype=np.float64),
+        clusters=np.array([NO_CLUSTER if c is None else c for c in clusters], dtype=np.int64),
+    )
+
+
+def positions(catalog, ids):
+    """Catalog positions of `ids` in their order, skipping ids the catalog doesn't hold."""
+    ids = np.asarray(ids, dtype=np.int64)
+    pos = np.searchsorted(catalog.ids, ids)
+    found = pos < len(catalog.ids)
+    found[found] = catalog.ids[pos[found]] == ids[found]
+    return pos[found]
+
+
+def _codes(vocab, values):
+    # Index of each value in the vocabulary, -1 (never equal) when absent
+    lookup = {value: code for code, value in enumerate(vocab)}
+    return np.array([lookup.get(value, -1) for value in values], dtype=np.int32)
+
+
+def score_cents(catalog, climates, budgets, ratings, columns=slice(None)):
+    """Scores of N profiles against the catalog as an (N, M) matrix of integer cents.
+
+    Same weights and branches as calculate_score and score_expression, in the
+    same floating point order, so the rounded values match them exactly.
+    """
+    climate_score = np.where(
+        catalog.climate_codes[columns][None, :] == _codes(catalog.climates, climates)[:, None], 1.0, 0.5
+    )
+    budget_score = np.where(
+        catalog.budget_codes[columns][None, :] == _codes(catalog.budgets, budgets)[:, None], 1.0, 0.3
+    )
+    wanted = np.array([np.nan if r is None else float(r) for r in ratings], dtype=np.float64)[:, None]
+    dest_ratings = catalog.ratings[columns][None, :]
+    with np.errstate(invalid='ignore'):
+        rating_score = np.where(dest_ratings >= wanted, wanted / 5.0, 0.0)
+    rating_score = np.where(np.isnan(dest_ratings) | np.isnan(wanted), 0.5, rating_score)
+    score = (0.4 * climate_score + 0.3 * budget_score + 0.3 * rating_score) * 100
+    return np.rint(score * 100).astype(np.int64)
+
+
+def top_k(catalog, climates, budgets, ratings, clusters, k):
+    """Best k catalog positions per profile, in home page order.
+
+    The order is cluster members first, then score descending, then id, all
+    folded into one unique integer key per cell so a single argpartition
+    finds the top k. Returns (positions, cents), both (N, k) or narrower
+    when the catalog is smaller than k.
+    """
+    n, m = len(climates), len(catalog.ids)
+    k = min(k, m)
+    positions = np.empty((n, k), dtype=np.int64)
+    cents = np.empty((n, k), dtype=np.int64)
+    if k == 0:
+        return positions, cents
+
+    wanted_clusters = np.array([NO_CLUSTER if c is None else c for c in clusters], dtype=np.int64)
+    id_span = int(catalog.ids.max()) + 1
+    chunk = max(1, CHUNK_CELLS // m)
+    for start in range(0, n, chunk):
+        rows = slice(start, start + chunk)
+        chunk_cents = score_cents(catalog, climates[rows], budgets[rows], ratings[rows])
+        # Without a cluster every destination counts as a member, like cluster_first(None)
+        outside = (catalog.clusters[None, :] != wanted_clusters[rows, None]) & (wanted_clusters[rows, None] != NO_CLUSTER)
+        keys = (outside * (MAX_SCORE_CENTS + 1) + (MAX_SCORE_CENTS - chunk_cents)) * id_span + catalog.ids[None, :]
+        if k < m:
+            best = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        else:
+            best = np.broadcast_to(np.arange(m), keys.shape)
+        order = np.argsort(np.take_along_axis(keys, best, axis=1), axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        positions[rows] = best
+        cents[rows] = np.take_along_axis(chunk_cents, best, axis=1)
+    return positions, cents
@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+import numpy as np
+
+# Feature order of every matrix handed to the scaler and the model
+FEATURES = ('budget', 'climate', 'rating')
+BUDGET_LEVELS = ('Low', 'Medium', 'High')
+CLIMATES = ('Tropical', 'Savanna', 'Arid', 'Temperate')
+# Other spellings that have turned up in code and data
+CLIMATE_ALIASES = {'Savannah': 'Savanna'}
+# Unknown or missing values fall back to these
+DEFAULT_BUDGET = 'Medium'
+DEFAULT_CLIMATE = 'Savanna'
+MISSING_RATING = 0.0
+
+SCHEMA = {
+    'features': FEATURES,
+    'budget': {'levels': BUDGET_LEVELS, 'default': DEFAULT_BUDGET},
+    'climate': {'levels': CLIMATES, 'aliases': CLIMATE_ALIASES, 'default': DEFAULT_CLIMATE},
+    'rating': {'missing': MISSING_RATING},
+}
+# Stored with the model artifacts; any change to the schema changes it
+SCHEMA_VERSION = hashlib.sha256(json.dumps(SCHEMA, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class SchemaMismatchError(RuntimeError):
+    pass
+
+
+def check_schema(version):
+    if version != SCHEMA_VERSION:
+        raise SchemaMismatchError(
+            f"Model was trained with feature schema {version!r}, "
+            f"but this code encodes features with {SCHEMA_VERSION!r}; retrain the model"
+        )
+
+
+def _encode_categories(values, levels, default, aliases=None):
+    values = np.asarray(values, dtype=object)
+    codes = np.full(len(values), levels.index(default), dtype=np.float32)
+    # One vectorized comparison per level rather than a dict lookup per row
+    for code, level in enumerate(levels):
+        codes[values == level] = code
+    for alias, level in (aliases or {}).items():
+        codes[values == alias] = levels.index(level)
+    return codes
+
+
+def encode_budget(values):
+    return _encode_categories(values, BUDGET_LEVELS, DEFAULT_BUDGET)
+
+
+def encode_climate(values):
+    return _encode_categories(values, CLIMATES, DEFAULT_CLIMATE, CLIMATE_ALIASES)
+
+
+def encode_rating(values):
+    # None becomes NaN on conversion, which is then treated as missing
+    ratings = np.asarray(values, dtype=np.float32)
+    return np.nan_to_num(ratings, nan=MISSING_RATING)
+
+
+def encode(budgets, climates, ratings, out=None):
+    """Encode whole columns into an (n, 3) float32 matrix in FEATURES order."""
+    if out is None:
+        out = np.empty((len(budgets), len(FEATURES)), dtype=np.float32)
+    out[:, 0] = encode_budget(budgets)
+    out[:, 1] = encode_climate(climates)
+    out[:, 2] = encode_rating(ratings)
+    return out
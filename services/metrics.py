@@ -0,0 +1,127 @@
+import contextvars
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Span durations of the request being handled on this thread, if any
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class Metrics:
+    """Counters and latency histograms rendered in the Prometheus text format.
+
+    Timing spans are recorded in the `span_duration_seconds` histogram and,
+    while a request is being tracked, summed per name for that request so
+    they can be sent back in a Server-Timing header. Values are per process;
+    every gunicorn worker exposes its own.
+    """
+
+    def __init__(self, prefix='', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        # (name, labels) -> [count per bucket..., sum, count]
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def record_span(self, name, seconds):
+        self.observe('span_duration_seconds', seconds, {'span': name})
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + seconds
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def start_request(self):
+        return _request_spans.set({})
+
+    def finish_request(self, token):
+        # Returns {span name: seconds} for the request
+        spans = _request_spans.get() or {}
+        _request_spans.reset(token)
+        return spans
+
+    def add_collector(self, collect):
+        # collect() yields (name, type, labels, value) read at scrape time,
+        # for figures other objects already keep (cache hits, versions)
+        self._collectors.append(collect)
+
+    def render(self):
+        families = defaultdict(list)
+        types = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                types[name] = 'counter'
+                families[name].append(('', labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                types[name] = 'histogram'
+                for bound, count in zip(self.buckets, histogram):
+                    families[name].append(('_bucket', labels + (('le', repr(bound)),), count))
+                families[name].append(('_bucket', labels + (('le', '+Inf'),), histogram[-1]))
+                families[name].append(('_sum', labels, histogram[-2]))
+                families[name].append(('_count', labels, histogram[-1]))
+        for collect in self._collectors:
+            for name, kind, labels, value in collect():
+                types[name] = kind
+                families[name].append(('', tuple(sorted((labels or {}).items())), value))
+
+        lines = []
+        for name in sorted(families):
+            full_name = self.prefix + name
+            lines.append(f'# TYPE {full_name} {types[name]}')
+            for suffix, labels, value in families[name]:
+                lines.append(f'{full_name}{suffix}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def server_timing(spans):
+    # Server-Timing header value; durations are in milliseconds
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in spans.items())
@@ -0,0 +1,254 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import numpy as np
+
+from services.feature_encoder import SCHEMA_VERSION, check_schema
+from services.lru import LRU
+
+ModelSnapshot = namedtuple('ModelSnapshot', ['version', 'model', 'scaler', 'artifact_version'])
+
+MODEL_FILE = 'kmeans_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+CLUSTERS_FILE = 'clusters.csv'
+# Scaler statistics and cluster centers as plain arrays; serving only needs these
+CENTROIDS_FILE = 'centroids.npz'
+
+
+class CentroidScaler:
+    """StandardScaler.transform from the fitted mean and scale."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class NearestCentroid:
+    """KMeans.predict from the fitted cluster centers: the index of the closest one."""
+
+    def __init__(self, centers):
+        self.cluster_centers_ = np.asarray(centers, dtype=np.float64)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        # |x - c|^2 = |x|^2 - 2x.c + |c|^2, and |x|^2 is the same for every center
+        distances = (self.cluster_centers_ ** 2).sum(axis=1) - 2 * X @ self.cluster_centers_.T
+        return distances.argmin(axis=1)
+
+
+def load_centroids(path):
+    with np.load(path) as arrays:
+        return NearestCentroid(arrays['centers']), CentroidScaler(arrays['mean'], arrays['scale'])
+
+
+class PredictionCache:
+    """Bounded LRU of preference -> cluster predictions for one model version."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = LRU(maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            value = self._entries.get(key) if version == self._version else None
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, version, key, value):
+        with self._lock:
+            if version != self._version:
+                if self._version is not None and version < self._version:
+                    # Computed against a model that has since been replaced
+                    return
+                self._entries.clear()
+                self._version = version
+            self._entries.set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'version': self._version,
+            }
+
+
+class ModelRegistry:
+    """Keeps the KMeans model and its scaler in memory.
+
+    Trained artifacts are written to their own version directory under
+    `artifacts_dir` and published by atomically replacing `manifest.json`,
+    so readers only ever load a complete model/scaler pair. The pair is
+    swapped in memory as a single snapshot. A version trained with a
+    different feature schema is refused with SchemaMismatchError.
+
+    Snapshots predict from the stored scaler statistics and cluster centers
+    with NumPy, so serving never imports scikit-learn or unpickles a model.
+    """
+
+    def __init__(self, artifacts_dir='artifacts', check_interval=1.0, keep_versions=3):
+        self.artifacts_dir = artifacts_dir
+        self.manifest_path = os.path.join(artifacts_dir, 'manifest.json')
+        # How often (in seconds) to check for versions published by other processes
+        self.check_interval = check_interval
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp = None
+        self._version = 0
+        self._last_check = 0.0
+        self.predictions = PredictionCache()
+
+    @property
+    def loaded_version(self):
+        # Version of the pair currently in memory, without touching the disk
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else None
+
+    @property
+    def loaded_artifact_version(self):
+        snapshot = self._snapshot
+        return snapshot.artifact_version if snapshot is not None else None
+
+    def _disk_stamp(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def artifact_path(self, manifest, name):
+        return os.path.join(self.artifacts_dir, manifest['version'], manifest['files'][name])
+
+    def get(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            self._last_check = now
+            stamp = self._disk_stamp()
+            if stamp is None or stamp == self._stamp:
+                return self._snapshot
+
+            manifest = self.read_manifest()
+            if manifest is None:
+                return self._snapshot
+            try:
+                # Fail before unpickling anything built for another feature encoding
+                check_schema(manifest.get('encoder_schema'))
+                if 'centroids' in manifest['files']:
+                    model, scaler = load_centroids(self.artifact_path(manifest, 'centroids'))
+                else:
+                    # Published before the centroids were stored
+                    import joblib
+                    model = joblib.load(self.artifact_path(manifest, 'model'))
+                    scaler = joblib.load(self.artifact_path(manifest, 'scaler'))
+            except (FileNotFoundError, TypeError, KeyError):
+                # A newer version replaced the one we were loading; keep
+                # serving the previous pair and retry on the next call
+                self._last_check = 0.0
+                return self._snapshot
+            if self._disk_stamp() != stamp:
+                self._last_check = 0.0
+                return self._snapshot
+
+            self._swap(model, scaler, stamp, manifest['version'])
+            return self._snapshot
+
+    @staticmethod
+    def new_version():
+        return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def published_versions(self):
+        # Versions still on disk, oldest first; anything else has been pruned
+        try:
+            names = os.listdir(self.artifacts_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name for name in names
+            if not name.startswith('.') and os.path.isdir(os.path.join(self.artifacts_dir, name))
+        )
+
+    def publish(self, model, scaler, clusters=None, version=None):
+        import joblib  # Only the training path writes pickles
+
+        # Write the new version off to the side, then flip the manifest in one rename
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        version = version or self.new_version()
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.artifacts_dir)
+        joblib.dump(model, os.path.join(staging, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+        np.savez(
+            os.path.join(staging, CENTROIDS_FILE),
+            centers=model.cluster_centers_, mean=scaler.mean_, scale=scaler.scale_,
+        )
+        files = {'model': MODEL_FILE, 'scaler': SCALER_FILE, 'centroids': CENTROIDS_FILE}
+        if clusters is not None:
+            clusters.to_csv(os.path.join(staging, CLUSTERS_FILE), index=False)
+            files['clusters'] = CLUSTERS_FILE
+        os.rename(staging, os.path.join(self.artifacts_dir, version))
+
+        manifest = {
+            'version': version,
+            'created_at': time.time(),
+            'encoder_schema': SCHEMA_VERSION,
+            'files': files,
+        }
+        fd, tmp_manifest = tempfile.mkstemp(prefix='.manifest-', dir=self.artifacts_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # Serve from the centroids here too, exactly like every other process
+        centroid_model = NearestCentroid(model.cluster_centers_)
+        centroid_scaler = CentroidScaler(scaler.mean_, scaler.scale_)
+        with self._lock:
+            self._swap(centroid_model, centroid_scaler, self._disk_stamp(), version)
+            self._last_check = time.monotonic()
+            snapshot = self._snapshot
+        self._prune_versions(version)
+        return snapshot
+
+    def _prune_versions(self, current):
+        for name in self.published_versions()[:-self.keep_versions]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.artifacts_dir, name), ignore_errors=True)
+
+    def _swap(self, model, scaler, stamp, artifact_version):
+        self._version += 1
+        self._stamp = stamp
+        self._snapshot = ModelSnapshot(self._version, model, scaler, artifact_version)
+        self.predictions.clear()
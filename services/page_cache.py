@@ -0,0 +1,65 @@
+import hashlib
+import json
+
+from services.lru import LRU
+
+
+class LocalStore:
+    """In-process LRU with the small get/set subset of the redis-py API we use."""
+
+    def __init__(self, maxsize=256):
+        self._entries = LRU(maxsize)
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def set(self, name, value, ex=None):
+        # Entries are only ever replaced by a newer version key, so ex is ignored
+        self._entries.set(name, value)
+        return True
+
+
+def make_store(url=None, maxsize=256):
+    # A redis:// URL shares rendered pages between workers; anything speaking
+    # the Redis protocol works. Without one, each process keeps its own LRU.
+    if not url:
+        return LocalStore(maxsize)
+    import redis
+    return redis.Redis.from_url(url)
+
+
+class PageCache:
+    """Rendered pages keyed on their inputs, stored with a strong ETag."""
+
+    def __init__(self, store, ttl=3600, prefix='page:'):
+        self.store = store
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, *parts):
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return self.prefix + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_etag(body):
+        return hashlib.sha256(body).hexdigest()[:32]
+
+    def get(self, key):
+        # Returns (etag, body) or None
+        value = self.store.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, _, body = value.partition(b'\n')
+        return etag.decode('ascii'), body
+
+    def set(self, key, body):
+        etag = self.make_etag(body)
+        self.store.set(key, etag.encode('ascii') + b'\n' + body, ex=self.ttl)
+        return etag
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses}
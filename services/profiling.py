@@ -0,0 +1,81 @@
+import cProfile
+import os
+import random
+import threading
+import time
+
+
+class SamplingProfiler:
+    """Profiles a random sample of requests with cProfile.
+
+    The sample rate is read from `control_file`, so profiling is switched
+    on and off at runtime, in every worker, without a restart:
+
+        echo 0.05 > instance/profile_rate   # profile 5% of requests
+        rm instance/profile_rate            # stop
+
+    Each sampled request is written to `output_dir` as a .prof file that
+    pstats or snakeviz can open.
+    """
+
+    def __init__(self, control_file, output_dir, check_interval=1.0):
+        self.control_file = control_file
+        self.output_dir = output_dir
+        self.check_interval = check_interval
+        self.sampled = 0
+        self._rate = 0.0
+        self._stamp = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        # Newer Pythons allow only one active cProfile per process
+        self._active = False
+
+    @property
+    def rate(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return self._rate
+        with self._lock:
+            self._last_check = now
+            try:
+                stat = os.stat(self.control_file)
+            except FileNotFoundError:
+                self._rate, self._stamp = 0.0, None
+                return self._rate
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp != self._stamp:
+                self._stamp = stamp
+                try:
+                    with open(self.control_file) as f:
+                        self._rate = min(max(float(f.read().strip() or 0), 0.0), 1.0)
+                except (OSError, ValueError):
+                    self._rate = 0.0
+            return self._rate
+
+    def start(self):
+        rate = self.rate
+        if not rate or random.random() >= rate:
+            return None
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) already owns the hook
+            self._active = False
+            return None
+        return profile
+
+    def stop(self, profile, name):
+        if profile is None:
+            return None
+        profile.disable()
+        self._active = False
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'{name}-{os.getpid()}-{time.time_ns()}.prof')
+        profile.dump_stats(path)
+        self.sampled += 1
+        return path
@@ -0,0 +1,54 @@
+import threading
+
+from services.lru import LRU
+
+
+class RankingCache:
+    """Arrays derived from the catalog (ranked destination ids, the batch
+    scoring columns), keyed by whatever determines them.
+
+    They are built lazily and evicted least recently used first. All of them
+    belong to one data/model version and are dropped as soon as a request
+    arrives for a newer version.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = LRU(maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, version, key, build):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            ids = self._entries.get(key)
+            if ids is not None:
+                self.hits += 1
+                return ids
+            self.misses += 1
+
+        # Build outside the lock so one slow query doesn't block other keys
+        ids = build()
+        with self._lock:
+            if version == self._version:
+                self._entries.set(key, ids)
+        return ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'version': self._version,
+            }
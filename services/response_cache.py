@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Optional, Tuple
+
+
+class ResponseCache:
+    """On-disk cache of API responses, stored as zlib-compressed JSON in SQLite.
+
+    Entries younger than `ttl` are fresh. Entries up to `ttl + stale_ttl` old
+    may still be served while the caller refreshes them; older ones are
+    dropped on read unless the caller asks for them with expire=False. The
+    least recently used entries are evicted once the store holds more than
+    `max_entries`.
+    """
+
+    def __init__(self, path: str = 'instance/api_cache.db', ttl: float = 24 * 3600,
+                 stale_ttl: float = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, "
+                "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(endpoint: str, **params: Any) -> str:
+        payload = json.dumps([endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, expire: bool = True) -> Tuple[Optional[Any], Optional[float]]:
+        # Returns (value, age in seconds), or (None, None) when missing or expired.
+        # With expire=False entries of any age are returned and kept
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, None
+            age = now - row[1]
+            if expire and age > self.ttl + self.stale_ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None, None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0])), age
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        body = zlib.compress(json.dumps(value).encode('utf-8'))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, body, now, now),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def is_fresh(self, age: float) -> bool:
+        return age <= self.ttl
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RetrainScheduler:
+    """Runs model training on a background thread, off the request path.
+
+    A request made while a retrain is running is covered by that run, so it
+    is dropped unless a model was published after the run started (as told
+    by `generation`, e.g. the registry's loaded version). Until the new
+    version is published, requests keep being served by the previous one.
+
+    `train` returns None when it had nothing to train on (or raises); new
+    requests are then ignored for `backoff` seconds, doubling on every
+    consecutive failure up to `max_backoff`.
+    """
+
+    def __init__(self, app, train, generation=None, backoff=30.0, max_backoff=600.0):
+        self.app = app
+        self.train = train
+        self.generation = generation or (lambda: None)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._pending = False
+        self._thread = None
+        self._run_generation = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def request(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                if self.generation() != self._run_generation:
+                    self._pending = True
+                return
+            if time.monotonic() < self._retry_at:
+                return
+            self._pending = True
+            self._thread = threading.Thread(target=self._run, name='kmeans-retrain', daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+                self._run_generation = self.generation()
+            result = None
+            try:
+                with self.app.app_context():
+                    result = self.train()
+            except Exception:
+                logger.exception("Background retrain failed")
+            with self._lock:
+                if result is None:
+                    self._failures += 1
+                    delay = min(self.backoff * 2 ** (self._failures - 1), self.max_backoff)
+                    self._retry_at = time.monotonic() + delay
+                    # Requests made during a failed run would only fail again
+                    self._pending = False
+                    logger.warning("Retrain produced no model; next attempt in %.0fs", delay)
+                else:
+                    self._failures = 0
+                    self._retry_at = 0.0
@@ -0,0 +1,15 @@
+from sqlalchemy import inspect, text
+
+
+def upgrade_schema(engine, table):
+    # db.create_all() never alters an existing table, so columns and indexes
+    # added to the model after a travel.db was created are added here.
+    existing = {column['name'] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(engine.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
@@ -0,0 +1,90 @@
+import re
+
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = 'destination_fts'
+# bm25() column weights: a hit in the name counts more than one in the city or info
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+_available = None
+
+
+def ensure_search_index(connection):
+    global _available
+    try:
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(name, city, info, prefix='2 3')"
+        ))
+        _available = True
+    except OperationalError:
+        # SQLite was built without FTS5; search falls back to LIKE
+        _available = False
+    return _available
+
+
+def is_available(connection):
+    global _available
+    if _available is None:
+        _available = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': FTS_TABLE}
+        ).first() is not None
+    return _available
+
+
+def rebuild_search_index(connection):
+    if not is_available(connection):
+        return
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    connection.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, city, info) "
+        f"SELECT id, name, city, info FROM destination"
+    ))
+
+
+def reindex_rows(connection, ids):
+    # Refresh the given destination ids; ids that no longer exist are just removed
+    if not ids or not is_available(connection):
+        return
+    ids = bindparam('ids', value=list(ids), expanding=True)
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(ids))
+    connection.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, city, info) "
+        f"SELECT id, name, city, info FROM destination WHERE id IN :ids"
+    ).bindparams(ids))
+
+
+def match_query(search_term):
+    # Quote every token so user input can't inject FTS5 syntax, and match each as a prefix
+    tokens = re.findall(r'\w+', search_term or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def ranked_matches(search_term):
+    # (id, rank) rows for the term; lower bm25 rank means more relevant
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    return text(
+        f"SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query"
+    ).bindparams(query=match_query(search_term))
+
+
+def register_search_sync(model):
+    # Keep single-row ORM changes in the index; bulk loads call rebuild_search_index
+    @event.listens_for(model, 'after_insert')
+    @event.listens_for(model, 'after_update')
+    def index_row(mapper, connection, target):
+        if not is_available(connection):
+            return
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': target.id})
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, name, city, info) VALUES (:id, :name, :city, :info)"),
+            {'id': target.id, 'name': target.name, 'city': target.city, 'info': target.info},
+        )
+
+    @event.listens_for(model, 'after_delete')
+    def unindex_row(mapper, connection, target):
+        if not is_available(connection):
+            return
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': target.id})
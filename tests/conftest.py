@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The app reads its configuration at import, so point it at a scratch
+# database and artifact directory before anything imports it
+WORKDIR = tempfile.mkdtemp(prefix='travel-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(WORKDIR, 'travel.db')}",
+    'MODEL_ARTIFACTS_DIR': os.path.join(WORKDIR, 'artifacts'),
+    'TRAVEL_API_CACHE': '',
+    'BACKGROUND_RETRAIN': '0',
+    'PROFILE_CONTROL_FILE': os.path.join(WORKDIR, 'profile_rate'),
+})
+
+# Destinations per city page served by the stub API
+PER_PAGE = 6
+
+
+@pytest.fixture(scope='session')
+def stub_api():
+    from benchmarks.micro import StubTravelAPI
+    return StubTravelAPI(per_page=PER_PAGE)
+
+
+@pytest.fixture(scope='session')
+def seed(stub_api):
+    import models
+    from seed_data import seed_destinations
+
+    # Every change must be visible to the next request
+    models.data_version_check_interval = 0
+
+    def seed(api=stub_api):
+        seed_destinations(pages=1, api=api)
+    return seed
+
+
+@pytest.fixture
+def catalog(seed):
+    # A freshly seeded and clustered catalog, restored after the test
+    seed()
+    yield
+    seed()
+
+
+@pytest.fixture
+def client(catalog):
+    from app import app
+    return app.test_client()
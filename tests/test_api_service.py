@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from services.api_service import SEARCH_HOTELS_ENDPOINT, TokenBucket, TravelAPI
+
+# geoIds the stub answers with a 503 once, and with a 500 every time
+FLAKY_GEO = 503
+BROKEN_GEO = 500
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        geo_id, page = int(params['geoId']), int(params['pageNumber'])
+        with self.server.lock:
+            self.server.requests.append((geo_id, page))
+            attempts = self.server.requests.count((geo_id, page))
+
+        if url.path != SEARCH_HOTELS_ENDPOINT:
+            status = 404
+        elif geo_id == BROKEN_GEO or (geo_id == FLAKY_GEO and attempts == 1):
+            status = 500 if geo_id == BROKEN_GEO else 503
+        else:
+            status = 200
+        body = json.dumps({'data': {'data': [{'id': f'{geo_id}-{page}', 'title': f'Hotel {geo_id}-{page}'}]}})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.requests = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api(server):
+    api = TravelAPI(
+        base_url=f'http://127.0.0.1:{server.server_port}', rate_limit=0, max_workers=4,
+        timeout=5, retries=2, offline=False,
+    )
+    # Always go to the stub server
+    api.cache = None
+    return api
+
+
+def test_every_city_and_page_is_fetched(server, api):
+    responses = api.fetch_all_destinations([1, 2, 3], pages=2, currency='NGN')
+    assert set(responses) == {(geo_id, page) for geo_id in (1, 2, 3) for page in (1, 2)}
+    for (geo_id, page), response in responses.items():
+        assert response['data']['data'][0]['id'] == f'{geo_id}-{page}'
+    assert sorted(server.requests) == sorted(responses)
+
+
+def test_server_errors_are_retried(server, api):
+    response = api.fetch_destinations(geoId=FLAKY_GEO, page=1, currency='NGN')
+    assert response['data']['data'][0]['id'] == f'{FLAKY_GEO}-1'
+    assert server.requests == [(FLAKY_GEO, 1), (FLAKY_GEO, 1)]
+
+
+def test_persistent_failure_returns_none_and_every_attempt_takes_a_token(server, api):
+    tokens = []
+    api.rate_limiter.acquire = lambda: tokens.append(1)
+    responses = api.fetch_all_destinations([1, BROKEN_GEO], currency='NGN')
+    assert responses[(BROKEN_GEO, 1)] is None
+    assert responses[(1, 1)] is not None
+    # The first try and both retries of the broken page, plus the good page
+    assert server.requests.count((BROKEN_GEO, 1)) == 3
+    assert len(tokens) == 4
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    bucket = TokenBucket(rate=50, capacity=2)
+    started = time.monotonic()
+    for _ in range(7):
+        bucket.acquire()
+    # Two tokens up front, then one every 20 ms
+    assert time.monotonic() - started >= 5 / 50 * 0.9
@@ -0,0 +1,77 @@
+import pytest
+
+from app import (
+    app, calculate_score, get_user_cluster, home_ranking, recommend_batch, suggest_ranking, user_prefs,
+)
+from models import Destination
+from services import batch_scoring
+
+PROFILES = [
+    {'budget': 'Low', 'climate': 'Tropical', 'rating': 4},
+    {'budget': 'Medium', 'climate': 'Savanna', 'rating': 2.5},
+    {'budget': 'High', 'climate': 'Arid', 'rating': 5},
+    {'budget': 'Medium', 'climate': 'Temperate', 'rating': 0},
+    {'budget': 'Low', 'climate': 'Nowhere'},
+    {},
+]
+
+
+@pytest.mark.parametrize('ranking', ['home', 'suggest'])
+def test_batch_matches_page_ordering(catalog, ranking):
+    with app.app_context():
+        results = recommend_batch(PROFILES, k=15, ranking=ranking)
+        destinations = {dest.id: dest for dest in Destination.query}
+
+        assert len(results) == len(PROFILES)
+        for result in results:
+            prefs = result['profile']
+            cluster = get_user_cluster(prefs)
+            assert result['cluster'] == cluster
+            expected = home_ranking(cluster, prefs) if ranking == 'home' else suggest_ranking(cluster)
+
+            ids = [dest['id'] for dest in result['destinations']]
+            assert ids == expected[:15].tolist()
+            for dest in result['destinations']:
+                assert dest['score'] == calculate_score(destinations[dest['id']], prefs)
+
+
+def test_ids_missing_from_the_catalog_are_skipped():
+    catalog = batch_scoring.build_catalog([(i, 'Tropical', 'Low', 4.0, 0) for i in (2, 4, 6)])
+    assert batch_scoring.positions(catalog, [6, 5, 2, 7, 4, 1]).tolist() == [2, 0, 1]
+
+
+def test_missing_fields_use_the_defaults(catalog):
+    with app.app_context():
+        [result] = recommend_batch([{}], k=1)
+    assert result['profile'] == user_prefs
+
+
+def test_batch_endpoint_pages_profiles(client):
+    response = client.post('/api/recommendations/batch?per_page=4&page=2', json={'profiles': PROFILES, 'k': 3})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['total_profiles'], body['total_pages']) == (len(PROFILES), 2)
+    assert [result['index'] for result in body['results']] == [4, 5]
+    assert all(len(result['destinations']) == 3 for result in body['results'])
+
+
+@pytest.mark.parametrize('body', [
+    [{'budget': 'Low'}],
+    'profiles',
+    {'profiles': {'budget': 'Low'}},
+    {'profiles': ['Low']},
+    {'profiles': [{'rating': 6}]},
+    {'profiles': [{'rating': -1}]},
+    {'profiles': [{'rating': 'NaN'}]},
+    {'profiles': [{'rating': 'high'}]},
+    {'profiles': [{'budget': ['Low']}]},
+    {'profiles': [{'climate': {}}]},
+    {'profiles': [{'climate': 3}]},
+    {'profiles': [], 'ranking': 'random'},
+    {'profiles': [], 'k': 0},
+    {'profiles': [], 'k': 1e400},
+])
+def test_invalid_requests_are_rejected(client, body):
+    response = client.post('/api/recommendations/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
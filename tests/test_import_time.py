@@ -0,0 +1,11 @@
+import pytest
+
+from benchmarks.import_time import MODULES, import_once
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_does_not_load_the_heavy_stack(module):
+    # Serving and the data scripts must stay free of scikit-learn, pandas,
+    # the plotting libraries and the HTTP client until they actually use them
+    _, heavy = import_once(module)
+    assert heavy == []
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from services.api_service import SEARCH_HOTELS_ENDPOINT, STAY_NIGHTS, TravelAPI
+from services.response_cache import ResponseCache
+
+TTL = 100
+STALE_TTL = 1000
+
+
+class FakeAPI(TravelAPI):
+    """TravelAPI whose HTTP request returns queued responses (None = failure)."""
+
+    def __init__(self, responses=(), **kwargs):
+        super().__init__(**kwargs)
+        self.responses = list(responses)
+        self.requests = 0
+
+    def _request_destinations(self, geoId, page, currency):
+        self.requests += 1
+        return self.responses.pop(0) if self.responses else None
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'api_cache.db'), ttl=TTL, stale_ttl=STALE_TTL, max_entries=3)
+
+
+def key(geo_id):
+    return ResponseCache.make_key(
+        SEARCH_HOTELS_ENDPOINT, geoId=geo_id, page=1, currency='NGN', check_in_offset=0, nights=STAY_NIGHTS
+    )
+
+
+def age(cache, geo_id, seconds):
+    with cache._connect() as conn:
+        conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time() - seconds, key(geo_id)))
+
+
+def fetch(api, geo_id=1):
+    return api.fetch_destinations(geoId=geo_id, page=1, currency='NGN')
+
+
+def test_fresh_entries_are_served_from_the_cache(cache):
+    api = FakeAPI([{'v': 1}], cache=cache, offline=False)
+    assert fetch(api) == {'v': 1}
+    assert fetch(api) == {'v': 1}
+    assert api.requests == 1
+
+
+def test_stale_entries_are_refetched_synchronously(cache):
+    api = FakeAPI([{'v': 1}, {'v': 2}], cache=cache, offline=False, stale_while_revalidate=False)
+    fetch(api)
+    age(cache, 1, TTL + 1)
+    assert fetch(api) == {'v': 2}
+    assert cache.get(key(1))[0] == {'v': 2}
+
+
+def test_stale_copy_is_served_when_the_refetch_fails(cache):
+    api = FakeAPI([{'v': 1}], cache=cache, offline=False, stale_while_revalidate=False)
+    fetch(api)
+    age(cache, 1, TTL + 1)
+    assert fetch(api) == {'v': 1}
+    assert api.requests == 2
+
+
+def test_stale_while_revalidate_refreshes_in_the_background(cache):
+    api = FakeAPI([{'v': 1}, {'v': 2}], cache=cache, offline=False, stale_while_revalidate=True)
+    fetch(api)
+    age(cache, 1, TTL + 1)
+    assert fetch(api) == {'v': 1}
+    api._refresh_pool.shutdown(wait=True)
+    assert api.requests == 2
+    assert fetch(api) == {'v': 2}
+
+
+def test_offline_serves_and_keeps_expired_entries(cache):
+    fetch(FakeAPI([{'v': 1}], cache=cache, offline=False))
+    age(cache, 1, TTL + STALE_TTL + 1)
+
+    offline = FakeAPI(cache=cache, offline=True)
+    assert fetch(offline) == {'v': 1}
+    assert fetch(offline) == {'v': 1}
+    assert fetch(offline, geo_id=2) is None
+    assert offline.requests == 0
+
+    # Online, the expired entry is dropped and fetched again
+    online = FakeAPI([{'v': 2}], cache=cache, offline=False)
+    assert fetch(online) == {'v': 2}
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for geo_id in (1, 2, 3):
+        cache.set(key(geo_id), {'geo': geo_id})
+        with cache._connect() as conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (geo_id, key(geo_id)))
+    cache.get(key(1))
+    cache.set(key(4), {'geo': 4})
+    assert cache.get(key(2)) == (None, None)
+    assert [cache.get(key(geo_id))[0] for geo_id in (1, 3, 4)] == [{'geo': 1}, {'geo': 3}, {'geo': 4}]
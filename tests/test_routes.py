@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.mark.parametrize('method, path, data', [
+    ('get', '/', None),
+    ('get', '/?page=2', None),
+    ('post', '/suggest', {'budget': 'Low', 'weather': 'Tropical', 'rating': '3'}),
+    ('post', '/suggest', {}),
+    ('post', '/search', {'search_term': 'Stub Hotel'}),
+    ('post', '/search', {'search_term': 'breakfast'}),
+])
+def test_pages_list_destinations(client, method, path, data):
+    response = getattr(client, method)(path, data=data)
+    assert response.status_code == 200
+    assert b'Stub Hotel' in response.data
+
+
+def test_search_without_matches(client):
+    response = client.post('/search', data={'search_term': 'no such place'})
+    assert response.status_code == 200
+    assert b'Stub Hotel' not in response.data
+
+
+def test_unchanged_page_revalidates_with_304(client):
+    first = client.get('/')
+    assert first.headers['ETag']
+    second = client.get('/', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+
+
+def test_metrics(client):
+    client.get('/')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'travel_requests_total' in response.data
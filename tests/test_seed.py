@@ -0,0 +1,24 @@
+from conftest import PER_PAGE
+from instance.location_map import location_map
+from clustering import model_registry
+from models import app, db, Destination, DestinationCluster
+
+DESTINATIONS = len(location_map) * PER_PAGE
+
+
+def destinations():
+    # Names and the clusters the published model gave them
+    with app.app_context():
+        rows = db.session.query(Destination.external_id, Destination.name, DestinationCluster.cluster).outerjoin(
+            DestinationCluster,
+            (DestinationCluster.destination_id == Destination.id)
+            & (DestinationCluster.model_version == model_registry.read_manifest()['version']),
+        )
+        return {external_id: (name, cluster) for external_id, name, cluster in rows}
+
+
+def test_seed_stores_clean_clustered_destinations(catalog):
+    rows = destinations()
+    assert len(rows) == DESTINATIONS
+    assert all(cluster is not None for _, cluster in rows.values())
+    assert not any(name[0].isdigit() for name, _ in rows.values())
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from clustering import load_feature_matrix, model_registry, train_kmeans_model
+from models import app, db, Destination, DestinationCluster
+from services.feature_encoder import encode
+
+
+def test_streamed_features_match_the_rows(catalog):
+    with app.app_context():
+        ids, X = load_feature_matrix(chunk_size=7)
+        rows = db.session.query(
+            Destination.id, Destination.budget_category, Destination.climate, Destination.rating,
+        ).order_by(Destination.id).all()
+    assert ids.tolist() == [row[0] for row in rows]
+    _, budgets, climates, ratings = zip(*rows)
+    np.testing.assert_array_equal(X, encode(budgets, climates, ratings))
+
+
+@pytest.mark.parametrize('mode', ['full', 'minibatch'])
+def test_training_publishes_and_labels_every_row(catalog, mode):
+    with app.app_context():
+        model, _, clusters = train_kmeans_model(mode=mode)
+        snapshot = model_registry.get()
+        labels = dict(
+            db.session.query(DestinationCluster.destination_id, DestinationCluster.cluster)
+            .filter_by(model_version=snapshot.artifact_version)
+        )
+        kept = {version for (version,) in db.session.query(DestinationCluster.model_version).distinct()}
+    assert snapshot.artifact_version == model_registry.read_manifest()['version']
+    assert kept <= set(model_registry.published_versions())
+    assert labels == dict(zip(clusters['id'].tolist(), clusters['cluster'].tolist()))
+    # Serving predicts from the stored centroids; they must agree with the
+    # fitted model, which was trained on float32 features
+    X = snapshot.scaler.transform(encode(['Low', 'High'], ['Tropical', 'Arid'], [2.0, 5.0]))
+    np.testing.assert_array_equal(snapshot.model.predict(X), model.predict(X.astype(np.float32)))
+
+
+def test_failed_publish_leaves_the_served_labels_alone(catalog, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    with app.app_context():
+        before = model_registry.read_manifest()['version']
+        labels = db.session.query(DestinationCluster).count()
+        monkeypatch.setattr(model_registry, 'publish', fail)
+        with pytest.raises(OSError):
+            train_kmeans_model()
+        assert model_registry.read_manifest()['version'] == before
+        assert db.session.query(DestinationCluster).count() == labels
+        kept = {version for (version,) in db.session.query(DestinationCluster.model_version).distinct()}
+    assert kept <= set(model_registry.published_versions())
@@ -0,0 +1,64 @@
+from benchmarks.micro import StubTravelAPI
+from conftest import PER_PAGE
+from test_seed import DESTINATIONS, destinations
+
+
+class ChangedAPI(StubTravelAPI):
+    """The stub catalog with one hotel renamed and one no longer listed."""
+
+    renamed = None
+    removed = None
+
+    def fetch_all_destinations(self, geo_ids, pages=1, currency=None):
+        responses = super().fetch_all_destinations(geo_ids, pages, currency)
+        hotels = next(iter(responses.values()))['data']['data']
+        hotels[0]['title'] = '1. Renamed Hotel'
+        self.renamed = hotels[0]['id']
+        self.removed = hotels.pop()['id']
+        return responses
+
+
+class FailingAPI(StubTravelAPI):
+    """The stub catalog where the first city's page failed to fetch."""
+
+    def fetch_all_destinations(self, geo_ids, pages=1, currency=None):
+        responses = super().fetch_all_destinations(geo_ids, pages, currency)
+        responses[next(iter(responses))] = None
+        return responses
+
+
+class DownAPI(StubTravelAPI):
+    """The API with every page failing."""
+
+    def fetch_all_destinations(self, geo_ids, pages=1, currency=None):
+        return {key: None for key in super().fetch_all_destinations(geo_ids, pages, currency)}
+
+
+def test_reseed_upserts_changes_and_prunes_missing(catalog, seed, capsys):
+    seed()
+    assert '0 new or changed, 0 removed' in capsys.readouterr().out
+
+    api = ChangedAPI(per_page=PER_PAGE)
+    seed(api)
+    assert '1 new or changed, 1 removed' in capsys.readouterr().out
+    rows = destinations()
+    assert len(rows) == DESTINATIONS - 1
+    assert api.removed not in rows
+    assert rows[api.renamed][0] == 'Renamed Hotel'
+    assert rows[api.renamed][1] is not None
+
+
+def test_failed_page_keeps_its_destinations(catalog, seed, capsys):
+    seed(FailingAPI(per_page=PER_PAGE))
+    out = capsys.readouterr().out
+    assert 'Failed to fetch 1 of' in out
+    assert '0 removed' in out
+    assert len(destinations()) == DESTINATIONS
+
+
+def test_api_down_keeps_the_catalog(catalog, seed, capsys):
+    seed(DownAPI(per_page=PER_PAGE))
+    out = capsys.readouterr().out
+    assert 'No data fetched from API' in out
+    assert '0 removed' in out
+    assert len(destinations()) == DESTINATIONS
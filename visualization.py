@@ -1,96 +1,169 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-import seaborn as sns
-from app import Destination, app
+import argparse
+import json
 import os
-import joblib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_visualizations():
+from models import Destination, DestinationCluster, app, db, current_data_version
+from clustering import model_registry
+from services.feature_encoder import CLIMATES, BUDGET_LEVELS, SCHEMA_VERSION, encode
+
+OUTPUT_DIR = os.path.join('static', 'visualizations')
+# Records the data/model version every output was generated from
+MANIFEST_FILE = 'manifest.json'
+STATS_FILE = 'cluster_statistics.csv'
+# Bump when the plotting code changes so existing images are redrawn
+RENDER_VERSION = 2
+# Larger catalogs are plotted from a stratified sample of this many points
+MAX_POINTS = 20_000
+
+def load_frame(model_version):
+    # Not needed when every output is up to date
+    import pandas as pd
+
+    rows = (
+        db.session.query(Destination.budget_category, Destination.climate, Destination.rating, DestinationCluster.cluster)
+        # Only rows the published model has labelled
+        .join(DestinationCluster, DestinationCluster.destination_id == Destination.id)
+        .filter(DestinationCluster.model_version == model_version)
+        .all()
+    )
+    df = pd.DataFrame(rows, columns=['budget_category', 'climate_type', 'rating', 'cluster'])
+    # Same encoding the model was trained with
+    features = encode(df['budget_category'], df['climate_type'], df['rating'])
+    df['budget'], df['climate'], df['rating'] = features[:, 0], features[:, 1], features[:, 2]
+    df['cluster'] = df['cluster'].astype(int)
+    return df
+
+def cluster_statistics(df):
+    # One pass over the full catalog; the plots reuse it for the cluster means
+    return df.groupby('cluster').agg(**{
+        'Avg Budget': ('budget', 'mean'),
+        'Count': ('budget', 'count'),
+        'Avg Climate': ('climate', 'mean'),
+        'Avg Rating': ('rating', 'mean'),
+    }).round(2)
+
+def sample_points(df, max_points):
+    # Same share of every cluster, so the picture doesn't change, only the ink
+    if len(df) <= max_points:
+        return df
+    return df.groupby('cluster', group_keys=False).sample(frac=max_points / len(df), random_state=0)
+
+def _pyplot():
+    # Imported in the worker processes only, with the non-interactive backend
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def render_scatter(path, df, stats, x, style, title, xlabel):
+    plt = _pyplot()
+    import seaborn as sns
+
+    plt.figure(figsize=(12, 8))
+    sns.scatterplot(data=df, x=x, y='rating', hue='cluster', style=style, s=100)
+    mean_column = 'Avg Budget' if x == 'budget' else 'Avg Climate'
+    plt.scatter(stats[mean_column], stats['Avg Rating'], marker='X', s=300, c='black', label='Cluster mean')
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel('Rating')
+    plt.legend(title='Cluster', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def render_3d(path, df, title):
+    plt = _pyplot()
+
+    fig = plt.figure(figsize=(12, 8))
+    ax = fig.add_subplot(111, projection='3d')
+    scatter = ax.scatter(df['budget'], df['climate'], df['rating'], c=df['cluster'], cmap='viridis', s=100)
+    ax.set_xlabel('Budget Category')
+    ax.set_ylabel('Climate Type')
+    ax.set_zlabel('Rating')
+    plt.title(title)
+    plt.colorbar(scatter, label='Cluster')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_manifest(output_dir, manifest):
+    fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', dir=output_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST_FILE))
+
+def generate_visualizations(force=False, max_points=MAX_POINTS, workers=None, output_dir=OUTPUT_DIR):
     with app.app_context():
-        # Fetch data from database
-        destinations = Destination.query.all()
-        
-        # Prepare data for visualization
-        data = []
-        for d in destinations:
-            budget = {'Low': 0, 'Medium': 1, 'High': 2}.get(d.budget_category, 1)
-            climate = {'Tropical': 0, 'Savanna': 1, 'Arid': 2, 'Temperate': 3}.get(d.climate, 1)
-            rating = d.rating if d.rating is not None else 0
-            data.append({
-                'id': d.id,
-                'name': d.name,
-                'budget': budget,
-                'climate': climate,
-                'rating': rating,
-                'budget_category': d.budget_category,
-                'climate_type': d.climate
-            })
-
-        df = pd.DataFrame(data)
-        
-        # Load the trained model and clusters
-        model = joblib.load('kmeans_model.pkl')
-        scaler = joblib.load('scaler.pkl')
-        clusters_df = pd.read_csv('clusters.csv')
-        
-        # Add cluster information to the dataframe
-        df = df.merge(clusters_df, on='id')
-        
-        # Create visualizations directory
-        os.makedirs('static/visualizations', exist_ok=True)
-        
-        # 1. Budget vs Rating by Cluster
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(data=df, x='budget', y='rating', hue='cluster', style='budget_category', s=100)
-        plt.title('Destination Clusters: Budget vs Rating')
-        plt.xlabel('Budget Category (0=Low, 1=Medium, 2=High)')
-        plt.ylabel('Rating')
-        plt.legend(title='Cluster', bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
-        plt.savefig('static/visualizations/budget_rating_clusters.png')
-        plt.close()
-        
-        # 2. Climate vs Rating by Cluster
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(data=df, x='climate', y='rating', hue='cluster', style='climate_type', s=100)
-        plt.title('Destination Clusters: Climate vs Rating')
-        plt.xlabel('Climate Type (0=Tropical, 1=Savanna, 2=Arid, 3=Temperate)')
-        plt.ylabel('Rating')
-        plt.legend(title='Cluster', bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
-        plt.savefig('static/visualizations/climate_rating_clusters.png')
-        plt.close()
-        
-        # 3. 3D Visualization
-        fig = plt.figure(figsize=(12, 8))
-        ax = fig.add_subplot(111, projection='3d')
-        
-        scatter = ax.scatter(df['budget'], df['climate'], df['rating'],
-                           c=df['cluster'], cmap='viridis',
-                           s=100)
-        
-        ax.set_xlabel('Budget Category')
-        ax.set_ylabel('Climate Type')
-        ax.set_zlabel('Rating')
-        plt.title('3D Visualization of Destination Clusters')
-        plt.colorbar(scatter, label='Cluster')
-        plt.tight_layout()
-        plt.savefig('static/visualizations/3d_clusters.png')
-        plt.close()
-        
-        # Generate cluster statistics
-        cluster_stats = df.groupby('cluster').agg({
-            'budget': ['mean', 'count'],
-            'climate': 'mean',
-            'rating': 'mean'
-        }).round(2)
-        
-        cluster_stats.columns = ['Avg Budget', 'Count', 'Avg Climate', 'Avg Rating']
-        cluster_stats.to_csv('static/visualizations/cluster_statistics.csv')
-        
-        print("Visualizations generated successfully!")
+        model_manifest = model_registry.read_manifest()
+        version = {
+            'data_version': current_data_version(),
+            'model_version': model_manifest['version'] if model_manifest else None,
+            'encoder_schema': SCHEMA_VERSION,
+        }
+        plot_version = {**version, 'render_version': RENDER_VERSION, 'max_points': max_points}
+        wanted = {
+            STATS_FILE: version,
+            'budget_rating_clusters.png': plot_version,
+            'climate_rating_clusters.png': plot_version,
+            '3d_clusters.png': plot_version,
+        }
+
+        manifest = read_manifest(output_dir)
+        stale = [
+            name for name, key in wanted.items()
+            if force or manifest.get(name) != key or not os.path.exists(os.path.join(output_dir, name))
+        ]
+        if not stale:
+            print("Visualizations are up to date.")
+            return []
+
+        df = load_frame(version['model_version'])
+
+    os.makedirs(output_dir, exist_ok=True)
+    stats = cluster_statistics(df)
+    points = sample_points(df, max_points)
+    note = f" ({len(points):,} of {len(df):,} destinations)" if len(points) < len(df) else ''
+
+    jobs = {
+        'budget_rating_clusters.png': (render_scatter, (
+            points, stats, 'budget', 'budget_category', 'Destination Clusters: Budget vs Rating' + note,
+            'Budget Category (' + ', '.join(f'{i}={b}' for i, b in enumerate(BUDGET_LEVELS)) + ')',
+        )),
+        'climate_rating_clusters.png': (render_scatter, (
+            points, stats, 'climate', 'climate_type', 'Destination Clusters: Climate vs Rating' + note,
+            'Climate Type (' + ', '.join(f'{i}={c}' for i, c in enumerate(CLIMATES)) + ')',
+        )),
+        '3d_clusters.png': (render_3d, (points, '3D Visualization of Destination Clusters' + note)),
+    }
+    jobs = {name: job for name, job in jobs.items() if name in stale}
+
+    if STATS_FILE in stale:
+        stats.to_csv(os.path.join(output_dir, STATS_FILE))
+    if jobs:
+        # Every figure renders in its own process
+        with ProcessPoolExecutor(max_workers=min(workers or len(jobs), len(jobs))) as pool:
+            futures = [pool.submit(render, os.path.join(output_dir, name), *args) for name, (render, args) in jobs.items()]
+            for future in futures:
+                future.result()
+
+    manifest.update({name: wanted[name] for name in stale})
+    write_manifest(output_dir, manifest)
+    print(f"Visualizations generated successfully: {', '.join(stale)}")
+    return stale
 
 if __name__ == "__main__":
-    generate_visualizations()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Plot the destination clusters into static/visualizations")
+    parser.add_argument('--force', action='store_true', help="regenerate even if data and model are unchanged")
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS, help="plot a sample of at most this many destinations")
+    parser.add_argument('--workers', type=int, default=None, help="rendering processes (default: one per figure)")
+    args = parser.parse_args()
+    generate_visualizations(force=args.force, max_points=args.max_points, workers=args.workers)
@@ -0,0 +1,41 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py
+
+The master process imports this module once (preload_app), brings the
+database up to date and loads the model, scaler and warm caches. Workers
+are forked afterwards and share that memory copy-on-write; each opens its
+own read-only SQLite connections.
+"""
+import gc
+import os
+
+# Workers never train; publish new models with retrain.py
+os.environ.setdefault('BACKGROUND_RETRAIN', '0')
+
+from app import app, db, init_database, get_user_cluster, home_ranking, user_prefs
+from clustering import model_registry, train_kmeans_model, warm_prediction_cache
+
+def preload():
+    with app.app_context():
+        if init_database() or model_registry.get() is None:
+            train_kmeans_model()
+        snapshot = model_registry.get()
+        if snapshot is not None:
+            warm_prediction_cache(snapshot)
+            # The landing page ranking is requested by almost every visitor
+            home_ranking(get_user_cluster(user_prefs), user_prefs)
+        db.session.remove()
+        # No connection may be shared with the forked workers
+        db.engine.dispose()
+    # Keep the preloaded objects out of the collector so it doesn't touch
+    # (and copy) their pages in every worker
+    gc.freeze()
+
+def after_fork():
+    app.config['DATABASE_READONLY'] = True
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+preload()
+application = app